@@ -60,6 +60,11 @@ class Config:
         ) = self.arg_parse()
         self.instead = ""
         self.preprocess_per = 3.7
+        # Segments per net_g.infer call in Pipeline; 1 keeps the sequential loop
+        self.vc_batch_size = int(os.getenv("vc_batch_size", "1"))
+        # Processes for chunked harvest F0 in Pipeline; 1 runs harvest in a
+        # single pass, 0 uses n_cpu
+        self.f0_workers = int(os.getenv("f0_workers", "1"))
         self.x_pad, self.x_query, self.x_center, self.x_max = self.device_config()
 
     @staticmethod
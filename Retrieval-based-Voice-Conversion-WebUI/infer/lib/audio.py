@@ -1,5 +1,4 @@
 import platform, os
-import ffmpeg
 import numpy as np
 import av
 from io import BytesIO
@@ -30,27 +29,36 @@ def wav2(i, o, format):
     inp.close()
 
 
+def iter_audio(file, sr):
+    """Decode an audio file in-process, yielding mono float32 chunks at sr"""
+    file = clean_path(file)  # 防止小白拷路径头尾带了空格和"和回车
+    if os.path.exists(file) == False:
+        raise RuntimeError(
+            "You input a wrong audio path that does not exists, please fix it!"
+        )
+    # The default 5MB probe dominates decoding time for short uncompressed clips
+    with av.open(file, "r", options={"probesize": "32768"}) as container:
+        stream = container.streams.audio[0]
+        stream.thread_type = "AUTO"
+        # Down-mixing and resampling go through libswresample, as the ffmpeg CLI does
+        resampler = av.AudioResampler(format="flt", layout="mono", rate=sr)
+        for frame in container.decode(stream):
+            for out in resampler.resample(frame):
+                yield out.to_ndarray().reshape(-1)
+        for out in resampler.resample(None):
+            yield out.to_ndarray().reshape(-1)
+
+
 def load_audio(file, sr):
     try:
-        # https://github.com/openai/whisper/blob/main/whisper/audio.py#L26
-        # This launches a subprocess to decode audio while down-mixing and resampling as necessary.
-        # Requires the ffmpeg CLI and `ffmpeg-python` package to be installed.
-        file = clean_path(file)  # 防止小白拷路径头尾带了空格和"和回车
-        if os.path.exists(file) == False:
-            raise RuntimeError(
-                "You input a wrong audio path that does not exists, please fix it!"
-            )
-        out, _ = (
-            ffmpeg.input(file, threads=0)
-            .output("-", format="f32le", acodec="pcm_f32le", ac=1, ar=sr)
-            .run(cmd=["ffmpeg", "-nostdin"], capture_stdout=True, capture_stderr=True)
-        )
+        chunks = list(iter_audio(file, sr))
     except Exception as e:
         traceback.print_exc()
         raise RuntimeError(f"Failed to load audio: {e}")
 
-    return np.frombuffer(out, np.float32).flatten()
-
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(chunks)
 
 
 def clean_path(path_str):
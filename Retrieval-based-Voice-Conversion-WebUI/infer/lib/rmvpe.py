@@ -493,10 +493,18 @@ class MelSpectrogram(torch.nn.Module):
 
 
 class RMVPE:
-    def __init__(self, model_path: str, is_half, device=None, use_jit=False):
+    def __init__(
+        self,
+        model_path: str,
+        is_half,
+        device=None,
+        use_jit=False,
+        decode_on_device=False,
+    ):
         self.resample_kernel = {}
         self.resample_kernel = {}
         self.is_half = is_half
+        self.decode_on_device = decode_on_device
         if device is None:
             device = "cuda:0" if torch.cuda.is_available() else "cpu"
         self.device = device
@@ -606,6 +614,10 @@ class RMVPE:
         # torch.cuda.synchronize()
         # t2 = ttime()
         # print(234234,hidden.device.type)
+        if self.decode_on_device and "privateuseone" not in str(self.device):
+            # Only the per-frame f0 leaves the device, not the salience map
+            f0 = self.decode_torch(hidden.squeeze(0).float(), thred=thred)
+            return f0.cpu().numpy()
         if "privateuseone" not in str(self.device):
             hidden = hidden.squeeze(0).cpu().numpy()
         else:
@@ -622,19 +634,20 @@ class RMVPE:
     def to_local_average_cents(self, salience, thred=0.05):
         # t0 = ttime()
         center = np.argmax(salience, axis=1)  # 帧长#index
-        salience = np.pad(salience, ((0, 0), (4, 4)))  # 帧长,368
         # t1 = ttime()
-        center += 4
-        todo_salience = []
-        todo_cents_mapping = []
-        starts = center - 4
-        ends = center + 5
-        for idx in range(salience.shape[0]):
-            todo_salience.append(salience[:, starts[idx] : ends[idx]][idx])
-            todo_cents_mapping.append(self.cents_mapping[starts[idx] : ends[idx]])
+        # 9-bin window around each peak, gathered for all frames at once;
+        # bins past either edge count as zero salience, as with the old 4-bin pad
+        window = center[:, None] + np.arange(-4, 5)  # 帧长，9
+        in_range = (window >= 0) & (window < salience.shape[1])
+        todo_salience = np.where(
+            in_range,
+            np.take_along_axis(
+                salience, np.clip(window, 0, salience.shape[1] - 1), axis=1
+            ),
+            0,
+        )  # 帧长，9
+        todo_cents_mapping = self.cents_mapping[window + 4]  # 帧长，9
         # t2 = ttime()
-        todo_salience = np.array(todo_salience)  # 帧长，9
-        todo_cents_mapping = np.array(todo_cents_mapping)  # 帧长，9
         product_sum = np.sum(todo_salience * todo_cents_mapping, 1)
         weight_sum = np.sum(todo_salience, 1)  # 帧长
         devided = product_sum / weight_sum  # 帧长
@@ -645,6 +658,33 @@ class RMVPE:
         # print("decode:%s\t%s\t%s\t%s" % (t1 - t0, t2 - t1, t3 - t2, t4 - t3))
         return devided
 
+    def to_local_average_cents_torch(self, salience, thred=0.05):
+        """Same as to_local_average_cents, on a (frames, 360) tensor on its own device"""
+        center = torch.argmax(salience, dim=1)
+        window = center.unsqueeze(1) + torch.arange(-4, 5, device=salience.device)
+        in_range = (window >= 0) & (window < salience.shape[1])
+        todo_salience = torch.where(
+            in_range,
+            torch.gather(salience, 1, window.clamp(0, salience.shape[1] - 1)),
+            torch.zeros((), dtype=salience.dtype, device=salience.device),
+        )
+        cents_mapping = torch.from_numpy(self.cents_mapping).to(
+            device=salience.device, dtype=salience.dtype
+        )
+        todo_cents_mapping = cents_mapping[window + 4]
+        product_sum = torch.sum(todo_salience * todo_cents_mapping, 1)
+        weight_sum = torch.sum(todo_salience, 1)
+        devided = product_sum / weight_sum
+        maxx = torch.max(salience, dim=1).values
+        devided[maxx <= thred] = 0
+        return devided
+
+    def decode_torch(self, hidden, thred=0.03):
+        cents_pred = self.to_local_average_cents_torch(hidden, thred=thred)
+        f0 = 10 * (2 ** (cents_pred / 1200))
+        f0[f0 == 10] = 0
+        return f0
+
 
 if __name__ == "__main__":
     import librosa
@@ -0,0 +1,87 @@
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyworld
+
+_pools = {}
+
+
+def world_f0(x, fs, f0_floor, f0_ceil, frame_period, method="harvest"):
+    """F0 of x with pyworld harvest or dio, refined by stonemask"""
+    x = x.astype(np.double)
+    extract = pyworld.harvest if method == "harvest" else pyworld.dio
+    f0, t = extract(
+        x, fs=fs, f0_ceil=f0_ceil, f0_floor=f0_floor, frame_period=frame_period
+    )
+    return pyworld.stonemask(x, f0, t, fs)
+
+
+def _world_f0_chunk(args):
+    return world_f0(*args)
+
+
+def _pool(n_workers):
+    # Forking a process that already runs torch threads can deadlock the
+    # children, so workers start from a clean interpreter instead
+    if n_workers not in _pools:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            "forkserver" if "forkserver" in methods else "spawn"
+        )
+        _pools[n_workers] = ProcessPoolExecutor(
+            max_workers=n_workers, mp_context=context
+        )
+    return _pools[n_workers]
+
+
+@atexit.register
+def _shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    _pools.clear()
+
+
+def chunked_world_f0(
+    x,
+    fs,
+    f0_floor,
+    f0_ceil,
+    frame_period,
+    method="harvest",
+    n_workers=1,
+    overlap=1.0,
+    min_chunk=5.0,
+):
+    """world_f0 split into chunks that run on up to n_workers processes.
+
+    Every chunk is analysed with `overlap` seconds of extra audio on both
+    sides and only its own frames are kept, so the stitched contour matches
+    the serial one except where harvest's contour fixing reaches across
+    that margin. Inputs shorter than two chunks of `min_chunk` seconds are
+    analysed serially.
+    """
+    hop = int(round(fs * frame_period / 1000))
+    n_workers = min(int(n_workers), int(len(x) / fs / min_chunk))
+    # Chunks must start on a frame boundary
+    if n_workers <= 1 or hop * 1000 != fs * frame_period:
+        return world_f0(x, fs, f0_floor, f0_ceil, frame_period, method)
+
+    # Same frame count as pyworld uses for the whole signal
+    n_frames = int(1000.0 * len(x) / fs / frame_period) + 1
+    part = -(-n_frames // n_workers)  # frames per chunk
+    margin = int(overlap * fs) // hop * hop
+    jobs, spans = [], []
+    for first in range(0, n_frames, part):
+        last = min(first + part, n_frames)
+        start = max(first * hop - margin, 0)
+        end = min(last * hop + margin, len(x))
+        jobs.append((x[start:end], fs, f0_floor, f0_ceil, frame_period, method))
+        spans.append((first, last, first - start // hop))
+    f0 = np.zeros(n_frames, dtype=np.double)
+    for (first, last, offset), chunk in zip(
+        spans, _pool(n_workers).map(_world_f0_chunk, jobs)
+    ):
+        f0[first:last] = chunk[offset : offset + last - first]
+    return f0
@@ -9,9 +9,9 @@ sys.path.append(now_dir)
 import logging
 
 import numpy as np
-import pyworld
 
 from infer.lib.audio import load_audio
+from infer.lib.world_f0 import chunked_world_f0
 
 logging.getLogger("numba").setLevel(logging.WARNING)
 from multiprocessing import Process
@@ -28,6 +28,9 @@ def printt(strr):
 
 n_p = int(sys.argv[2])
 f0method = sys.argv[3]
+# Optional processes per file for harvest/dio; training slices are short, so
+# the default keeps the per-file parallelism above
+n_f0_workers = int(sys.argv[4]) if len(sys.argv) > 4 else 1
 
 
 class FeatureInput(object):
@@ -63,24 +66,16 @@ class FeatureInput(object):
                 f0 = np.pad(
                     f0, [[pad_size, p_len - len(f0) - pad_size]], mode="constant"
                 )
-        elif f0_method == "harvest":
-            f0, t = pyworld.harvest(
-                x.astype(np.double),
-                fs=self.fs,
-                f0_ceil=self.f0_max,
-                f0_floor=self.f0_min,
-                frame_period=1000 * self.hop / self.fs,
+        elif f0_method in ("harvest", "dio"):
+            f0 = chunked_world_f0(
+                x,
+                self.fs,
+                self.f0_min,
+                self.f0_max,
+                1000 * self.hop / self.fs,
+                f0_method,
+                n_f0_workers,
             )
-            f0 = pyworld.stonemask(x.astype(np.double), f0, t, self.fs)
-        elif f0_method == "dio":
-            f0, t = pyworld.dio(
-                x.astype(np.double),
-                fs=self.fs,
-                f0_ceil=self.f0_max,
-                f0_floor=self.f0_min,
-                frame_period=1000 * self.hop / self.fs,
-            )
-            f0 = pyworld.stonemask(x.astype(np.double), f0, t, self.fs)
         elif f0_method == "rmvpe":
             if hasattr(self, "model_rmvpe") == False:
                 from infer.lib.rmvpe import RMVPE
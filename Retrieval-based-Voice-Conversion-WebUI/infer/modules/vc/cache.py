@@ -0,0 +1,266 @@
+import os
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+import faiss
+import numpy as np
+
+
+class IndexCache:
+    """Keeps loaded faiss indexes and their reconstructed feature matrices.
+
+    Entries are keyed by index path and mtime, so a retrained index is picked
+    up automatically, and evicted least-recently-used once the total size
+    exceeds max_bytes. With use_mmap the reconstructed vectors are written
+    once to a .npy sidecar next to the index and memory-mapped afterwards.
+    """
+
+    def __init__(self, max_bytes, use_mmap=False):
+        self.max_bytes = max_bytes
+        self.use_mmap = use_mmap
+        self.entries = OrderedDict()  # key -> (index, big_npy, nbytes)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def sidecar_path(file_index):
+        return os.path.splitext(file_index)[0] + ".big_npy.npy"
+
+    def load_big_npy(self, file_index, index):
+        if not self.use_mmap:
+            return index.reconstruct_n(0, index.ntotal)
+        sidecar = self.sidecar_path(file_index)
+        if not (
+            os.path.exists(sidecar)
+            and os.path.getmtime(sidecar) >= os.path.getmtime(file_index)
+        ):
+            tmp = sidecar + ".tmp.npy"
+            np.save(tmp, index.reconstruct_n(0, index.ntotal))
+            os.replace(tmp, sidecar)
+        return np.load(sidecar, mmap_mode="r")
+
+    def get(self, file_index):
+        """Return (index, big_npy) for file_index, loading it on a miss"""
+        file_index = os.path.abspath(file_index)
+        key = (file_index, os.stat(file_index).st_mtime_ns)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                index, big_npy, _ = self.entries[key]
+                return index, big_npy
+            self.misses += 1
+
+        index = faiss.read_index(file_index)
+        big_npy = self.load_big_npy(file_index, index)
+        # Memory-mapped vectors live in the page cache, not in our budget
+        nbytes = os.path.getsize(file_index) + (
+            0 if isinstance(big_npy, np.memmap) else big_npy.nbytes
+        )
+
+        with self.lock:
+            # Drop stale generations of the same index
+            for stale in [k for k in self.entries if k[0] == file_index]:
+                self.total_bytes -= self.entries.pop(stale)[2]
+            self.entries[key] = (index, big_npy, nbytes)
+            self.total_bytes += nbytes
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted
+        logger.info("Loaded index %s (%.1f MB)", file_index, nbytes / 1024 / 1024)
+        return index, big_npy
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+
+def audio_hash(audio):
+    """Content hash of an audio array, used to key per-input caches"""
+    audio = np.ascontiguousarray(audio)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str((audio.dtype.str, audio.shape)).encode())
+    h.update(audio.data)
+    return h.hexdigest()
+
+
+class ArrayCache:
+    """Byte-bounded LRU of numpy arrays with an optional .npy store on disk.
+
+    Keys are tuples of plain values; they are hashed into file names for the
+    disk tier. Both tiers keep arrays in the dtype they were stored with, so
+    a hit returns the same values from memory or disk. Cached arrays are
+    returned read-only and shared between callers.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def key_name(key):
+        return hashlib.blake2b(repr(key).encode(), digest_size=20).hexdigest()
+
+    def _remember(self, name, arr):
+        arr.setflags(write=False)
+        with self.lock:
+            if name in self.entries:
+                self.total_bytes -= self.entries.pop(name).nbytes
+            self.entries[name] = arr
+            self.total_bytes += arr.nbytes
+            while self.total_bytes > self.max_bytes and self.entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+
+    def get(self, key):
+        """Return the cached array for key, or None"""
+        name = self.key_name(key)
+        with self.lock:
+            if name in self.entries:
+                self.entries.move_to_end(name)
+                self.hits += 1
+                return self.entries[name]
+        if self.disk_dir:
+            path = os.path.join(self.disk_dir, name + ".npy")
+            try:
+                arr = np.load(path)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError):
+                logger.warning("Dropping unreadable cache file %s", path)
+                os.remove(path)
+            else:
+                self.disk_hits += 1
+                self._remember(name, arr)
+                return arr
+        self.misses += 1
+        return None
+
+    def put(self, key, arr):
+        name = self.key_name(key)
+        arr = np.array(arr)
+        self._remember(name, arr)
+        if self.disk_dir:
+            path = os.path.join(self.disk_dir, name + ".npy")
+            tmp = "%s.%d.tmp.npy" % (path[:-4], os.getpid())
+            np.save(tmp, arr)
+            os.replace(tmp, path)
+        return arr
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+
+class ModelRegistry:
+    """Keeps several loaded models resident under a memory budget.
+
+    get(path, loader) returns the cached (meta, model) for path, or calls
+    loader() on a miss. Entries are keyed by path and mtime and evicted
+    least-recently-used once the parameters and buffers of all resident
+    models exceed max_bytes; the most recent model always stays.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (meta, model, nbytes)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def model_bytes(model):
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+    def get(self, path, loader):
+        key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                meta, model, _ = self.entries[key]
+                return meta, model
+            self.misses += 1
+
+        t0 = time.time()
+        meta, model = loader()
+        elapsed = time.time() - t0
+        nbytes = self.model_bytes(model)
+
+        with self.lock:
+            self.load_seconds += elapsed
+            for stale in [k for k in self.entries if k[0] == key[0]]:
+                self.total_bytes -= self.entries.pop(stale)[2]
+            self.entries[key] = (meta, model, nbytes)
+            self.total_bytes += nbytes
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted
+                self.evictions += 1
+        logger.info(
+            "Loaded %s in %.2fs (%.1f MB resident, %d models)",
+            path,
+            elapsed,
+            self.total_bytes / 1024 / 1024,
+            len(self.entries),
+        )
+        return meta, model
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "models": len(self.entries),
+                "resident_bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "load_seconds": self.load_seconds,
+            }
+
+
+index_cache = IndexCache(
+    max_bytes=int(os.getenv("index_cache_mb", "2048")) * 1024 * 1024,
+    use_mmap=os.getenv("index_cache_mmap", "0") == "1",
+)
+# HuBERT features do not depend on the target voice, only on the input audio
+# and the precision; half-precision runs store float16 features
+feature_cache = ArrayCache(
+    max_bytes=int(os.getenv("feature_cache_mb", "512")) * 1024 * 1024,
+    disk_dir=os.getenv("feature_cache_dir") or None,
+)
+# Pitch tracks are kept at full precision; they are small next to features
+f0_cache = ArrayCache(
+    max_bytes=int(os.getenv("f0_cache_mb", "64")) * 1024 * 1024,
+    disk_dir=os.getenv("f0_cache_dir") or None,
+)
+synthesizer_registry = ModelRegistry(
+    max_bytes=int(os.getenv("synthesizer_cache_mb", "2048")) * 1024 * 1024,
+)
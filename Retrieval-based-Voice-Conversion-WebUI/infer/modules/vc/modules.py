@@ -6,18 +6,63 @@ logger = logging.getLogger(__name__)
 import numpy as np
 import soundfile as sf
 import torch
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
+from time import time as ttime
 
-from infer.lib.audio import load_audio, wav2
+from infer.lib.audio import iter_audio, load_audio, wav2
 from infer.lib.infer_pack.models import (
     SynthesizerTrnMs256NSFsid,
     SynthesizerTrnMs256NSFsid_nono,
     SynthesizerTrnMs768NSFsid,
     SynthesizerTrnMs768NSFsid_nono,
 )
+from infer.modules.vc.cache import synthesizer_registry
 from infer.modules.vc.pipeline import Pipeline
 from infer.modules.vc.utils import *
 
+synthesizer_class = {
+    ("v1", 1): SynthesizerTrnMs256NSFsid,
+    ("v1", 0): SynthesizerTrnMs256NSFsid_nono,
+    ("v2", 1): SynthesizerTrnMs768NSFsid,
+    ("v2", 0): SynthesizerTrnMs768NSFsid_nono,
+}
+
+
+def load_synthesizer(person, config):
+    """Load a voice checkpoint and build its synthesizer on config.device
+
+    The weights are memory-mapped where the checkpoint format allows it and
+    dropped from the returned cpt once copied into net_g.
+    """
+    try:
+        cpt = torch.load(person, map_location="cpu", mmap=True)
+    except RuntimeError:
+        # Checkpoints saved without the zipfile format cannot be mapped
+        cpt = torch.load(person, map_location="cpu")
+    cpt["config"][-3] = cpt["weight"]["emb_g.weight"].shape[0]  # n_spk
+    if_f0 = cpt.get("f0", 1)
+    version = cpt.get("version", "v1")
+
+    net_g = synthesizer_class.get((version, if_f0), SynthesizerTrnMs256NSFsid)(
+        *cpt["config"], is_half=config.is_half
+    )
+
+    del net_g.enc_q
+
+    net_g.load_state_dict(cpt.pop("weight"), strict=False)
+    net_g.eval().to(config.device)
+    if config.is_half:
+        net_g = net_g.half()
+    else:
+        net_g = net_g.float()
+    return cpt, net_g
+
+
+def get_synthesizer(person, config):
+    """Return (cpt, net_g) for a voice, reusing resident synthesizers"""
+    return synthesizer_registry.get(person, lambda: load_synthesizer(person, config))
+
 
 class VC:
     def __init__(self, config):
@@ -56,6 +101,7 @@ class VC:
                 self.hubert_model is not None
             ):  # 考虑到轮询, 需要加个判断看是否 sid 是由有模型切换到无模型的
                 logger.info("Clean model cache")
+                synthesizer_registry.clear()
                 del (self.net_g, self.n_spk, self.hubert_model, self.tgt_sr)  # ,cpt
                 self.hubert_model = self.net_g = self.n_spk = self.hubert_model = (
                     self.tgt_sr
@@ -100,32 +146,11 @@ class VC:
         person = f'{os.getenv("weight_root")}/{sid}'
         logger.info(f"Loading: {person}")
 
-        self.cpt = torch.load(person, map_location="cpu")
+        self.cpt, self.net_g = get_synthesizer(person, self.config)
         self.tgt_sr = self.cpt["config"][-1]
-        self.cpt["config"][-3] = self.cpt["weight"]["emb_g.weight"].shape[0]  # n_spk
         self.if_f0 = self.cpt.get("f0", 1)
         self.version = self.cpt.get("version", "v1")
 
-        synthesizer_class = {
-            ("v1", 1): SynthesizerTrnMs256NSFsid,
-            ("v1", 0): SynthesizerTrnMs256NSFsid_nono,
-            ("v2", 1): SynthesizerTrnMs768NSFsid,
-            ("v2", 0): SynthesizerTrnMs768NSFsid_nono,
-        }
-
-        self.net_g = synthesizer_class.get(
-            (self.version, self.if_f0), SynthesizerTrnMs256NSFsid
-        )(*self.cpt["config"], is_half=self.config.is_half)
-
-        del self.net_g.enc_q
-
-        self.net_g.load_state_dict(self.cpt["weight"], strict=False)
-        self.net_g.eval().to(self.config.device)
-        if self.config.is_half:
-            self.net_g = self.net_g.half()
-        else:
-            self.net_g = self.net_g.float()
-
         self.pipeline = Pipeline(self.tgt_sr, self.config)
         n_spk = self.cpt["config"][-3]
         index = {"value": get_index_path_from_model(sid), "__type__": "update"}
@@ -166,7 +191,7 @@ class VC:
             audio_max = np.abs(audio).max() / 0.95
             if audio_max > 1:
                 audio /= audio_max
-            times = [0, 0, 0]
+            times = [0, 0, 0, 0]
 
             if self.hubert_model is None:
                 self.hubert_model = load_hubert(self.config)
@@ -215,7 +240,7 @@ class VC:
                 else "Index not used."
             )
             return (
-                "Success.\n%s\nTime:\nnpy: %.2fs, f0: %.2fs, infer: %.2fs."
+                "Success.\n%s\nTime:\nnpy: %.2fs, f0: %.2fs, infer: %.2fs, overlap: %.2fs."
                 % (index_info, *times),
                 (tgt_sr, audio_opt),
             )
@@ -224,6 +249,195 @@ class VC:
             logger.warning(info)
             return info, (None, None)
 
+    def vc_stream(
+        self,
+        sid,
+        input_audio_path,
+        f0_up_key,
+        f0_method,
+        file_index,
+        index_rate,
+        filter_radius,
+        resample_sr,
+        rms_mix_rate,
+        protect,
+    ):
+        """Convert input_audio_path with the loaded voice block by block.
+
+        Yields (sample rate, int16 block) as each segment is converted;
+        decoding and conversion both stream, so memory stays flat with input
+        length. Unlike vc_single the input is not peak-normalised first.
+        """
+        f0_up_key = int(f0_up_key)
+        if self.hubert_model is None:
+            self.hubert_model = load_hubert(self.config)
+        if self.tgt_sr != resample_sr >= 16000:
+            tgt_sr = resample_sr
+        else:
+            tgt_sr = self.tgt_sr
+        times = [0, 0, 0]
+        for block in self.pipeline.pipeline_stream(
+            self.hubert_model,
+            self.net_g,
+            sid,
+            iter_audio(input_audio_path, 16000),
+            times,
+            f0_up_key,
+            f0_method,
+            file_index,
+            index_rate,
+            self.if_f0,
+            filter_radius,
+            self.tgt_sr,
+            resample_sr,
+            rms_mix_rate,
+            self.version,
+            protect,
+        ):
+            yield tgt_sr, block
+        logger.info(
+            "Streamed conversion, npy: %.2fs, f0: %.2fs, infer: %.2fs" % tuple(times)
+        )
+
+    def vc_fanout(
+        self,
+        input_audio_path,
+        sids,
+        spk_id=0,
+        f0_up_key=0,
+        f0_method="rmvpe",
+        index_rate=0.75,
+        filter_radius=3,
+        resample_sr=0,
+        rms_mix_rate=0.25,
+        protect=0.33,
+        max_workers=None,
+    ):
+        """Convert one input with several voices in one pass.
+
+        sids are model names under weight_root, as passed to get_vc. Audio
+        loading, filtering, split points, F0 and HuBERT features are computed
+        once and shared; the synthesizers then run concurrently on up to
+        max_workers threads (n_cpu by default). Returns a dict of
+        sid -> (sample rate, int16 audio), with (None, None) for voices that
+        failed, and a dict of per-stage timings in seconds.
+        """
+        sids = list(dict.fromkeys(sids))
+        f0_up_key = int(f0_up_key)
+        outputs = {}
+        times = {"voices": {}}
+        if not sids:
+            return outputs, times
+        t_start = ttime()
+
+        t0 = ttime()
+        audio = load_audio(input_audio_path, 16000)
+        audio_max = np.abs(audio).max() / 0.95
+        if audio_max > 1:
+            audio /= audio_max
+        if self.hubert_model is None:
+            self.hubert_model = load_hubert(self.config)
+        t1 = ttime()
+        times["load"] = t1 - t0
+
+        def fail(sid):
+            info = traceback.format_exc()
+            logger.warning(info)
+            outputs[sid] = (None, None)
+            times["voices"][sid] = {"error": info}
+
+        voices = {}
+        for sid in sids:
+            try:
+                cpt, net_g = get_synthesizer(
+                    f'{os.getenv("weight_root")}/{sid}', self.config
+                )
+                voices[sid] = {
+                    "net_g": net_g,
+                    "tgt_sr": cpt["config"][-1],
+                    "if_f0": cpt.get("f0", 1),
+                    "version": cpt.get("version", "v1"),
+                }
+            except:
+                fail(sid)
+        t2 = ttime()
+        times["models"] = t2 - t1
+        if not voices:
+            times["total"] = ttime() - t_start
+            return outputs, times
+
+        # The front end does not depend on the target sample rate
+        front_pipeline = Pipeline(16000, self.config)
+        front_times = [0, 0, 0]
+        front = front_pipeline.prepare(
+            audio,
+            input_audio_path,
+            front_times,
+            f0_up_key,
+            f0_method,
+            int(any(voice["if_f0"] == 1 for voice in voices.values())),
+            filter_radius,
+        )
+        t3 = ttime()
+        times["f0"] = front_times[1]
+        times["prepare"] = t3 - t2 - front_times[1]
+
+        feats = {
+            version: front_pipeline.segment_features(self.hubert_model, front, version)
+            for version in {voice["version"] for voice in voices.values()}
+        }
+        t4 = ttime()
+        times["hubert"] = t4 - t3
+
+        def synthesize(sid):
+            voice = voices[sid]
+            t0 = ttime()
+            voice_times = [0, 0, 0]
+            pipeline = Pipeline(voice["tgt_sr"], self.config)
+            index, big_npy = pipeline.load_index(
+                get_index_path_from_model(sid), index_rate
+            )
+            audio_opt = pipeline.synthesize(
+                self.hubert_model,
+                voice["net_g"],
+                spk_id,
+                front,
+                voice_times,
+                index,
+                big_npy,
+                index_rate,
+                voice["if_f0"],
+                voice["tgt_sr"],
+                resample_sr,
+                rms_mix_rate,
+                voice["version"],
+                protect,
+                feats[voice["version"]],
+            )
+            tgt_sr = (
+                resample_sr
+                if voice["tgt_sr"] != resample_sr >= 16000
+                else voice["tgt_sr"]
+            )
+            return (tgt_sr, audio_opt), {
+                "npy": voice_times[0],
+                "infer": voice_times[2],
+                "total": ttime() - t0,
+            }
+
+        workers = max_workers or self.config.n_cpu or 1
+        with ThreadPoolExecutor(max_workers=min(workers, len(voices))) as executor:
+            futures = {sid: executor.submit(synthesize, sid) for sid in voices}
+            for sid, future in futures.items():
+                try:
+                    outputs[sid], times["voices"][sid] = future.result()
+                except:
+                    fail(sid)
+        times["synthesize"] = ttime() - t4
+        times["total"] = ttime() - t_start
+        # Keep the order of sids, failed loads included
+        return {sid: outputs[sid] for sid in sids}, times
+
     def vc_multi(
         self,
         sid,
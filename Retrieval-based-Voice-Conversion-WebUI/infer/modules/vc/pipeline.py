@@ -5,14 +5,12 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from time import time as ttime
 
-import faiss
 import librosa
 import numpy as np
 import parselmouth
-import pyworld
 import torch
 import torch.nn.functional as F
 import torchcrepe
@@ -21,23 +19,10 @@ from scipy import signal
 now_dir = os.getcwd()
 sys.path.append(now_dir)
 
-bh, ah = signal.butter(N=5, Wn=48, btype="high", fs=16000)
-
-input_audio_path2wav = {}
-
+from infer.lib.world_f0 import chunked_world_f0
+from infer.modules.vc.cache import audio_hash, f0_cache, feature_cache, index_cache
 
-@lru_cache
-def cache_harvest_f0(input_audio_path, fs, f0max, f0min, frame_period):
-    audio = input_audio_path2wav[input_audio_path]
-    f0, t = pyworld.harvest(
-        audio,
-        fs=fs,
-        f0_ceil=f0max,
-        f0_floor=f0min,
-        frame_period=frame_period,
-    )
-    f0 = pyworld.stonemask(audio, f0, t, fs)
-    return f0
+bh, ah = signal.butter(N=5, Wn=48, btype="high", fs=16000)
 
 
 def change_rms(data1, sr1, data2, sr2, rate):  # 1是输入音频，2是输出音频,rate是2的占比
@@ -62,6 +47,27 @@ def change_rms(data1, sr1, data2, sr2, rate):  # 1是输入音频，2是输出
     return data2
 
 
+def find_split_points(audio_pad, n, window, t_center, t_query):
+    """Pick the quietest point around every t_center samples as a cut point.
+
+    audio_pad is the signal reflect-padded by window // 2 on both sides and n
+    the unpadded length. The per-sample loudness is a box filter of width
+    window over |audio_pad|, computed from one cumulative sum; each cut point
+    is the first minimum within t_query of its centre, found for all centres
+    with a single argmin over a strided view.
+    """
+    centers = np.arange(t_center, n, t_center)
+    if centers.size == 0:
+        return []
+    csum = np.concatenate(([0.0], np.cumsum(np.abs(audio_pad), dtype=np.float64)))
+    audio_sum = csum[window : window + n] - csum[:n]
+    # Windows near the end run past the signal; +inf never wins the argmin
+    audio_sum = np.concatenate((audio_sum, np.full(t_query, np.inf)))
+    windows = np.lib.stride_tricks.sliding_window_view(audio_sum, 2 * t_query)
+    starts = centers - t_query
+    return (starts + np.argmin(windows[starts], axis=1)).tolist()
+
+
 class Pipeline(object):
     def __init__(self, tgt_sr, config):
         self.x_pad, self.x_query, self.x_center, self.x_max, self.is_half = (
@@ -80,23 +86,11 @@ class Pipeline(object):
         self.t_center = self.sr * self.x_center  # 查询切点位置
         self.t_max = self.sr * self.x_max  # 免查询时长阈值
         self.device = config.device
+        self.batch_size = config.vc_batch_size
+        self.f0_workers = config.f0_workers or config.n_cpu
 
-    def get_f0(
-        self,
-        input_audio_path,
-        x,
-        p_len,
-        f0_up_key,
-        f0_method,
-        filter_radius,
-        inp_f0=None,
-    ):
-        global input_audio_path2wav
+    def compute_f0(self, x, p_len, f0_method, filter_radius, f0_min, f0_max):
         time_step = self.window / self.sr * 1000
-        f0_min = 50
-        f0_max = 1100
-        f0_mel_min = 1127 * np.log(1 + f0_min / 700)
-        f0_mel_max = 1127 * np.log(1 + f0_max / 700)
         if f0_method == "pm":
             f0 = (
                 parselmouth.Sound(x, self.sr)
@@ -114,8 +108,9 @@ class Pipeline(object):
                     f0, [[pad_size, p_len - len(f0) - pad_size]], mode="constant"
                 )
         elif f0_method == "harvest":
-            input_audio_path2wav[input_audio_path] = x.astype(np.double)
-            f0 = cache_harvest_f0(input_audio_path, self.sr, f0_max, f0_min, 10)
+            f0 = chunked_world_f0(
+                x, self.sr, f0_min, f0_max, 10, "harvest", self.f0_workers
+            )
             if filter_radius > 2:
                 f0 = signal.medfilt(f0, 3)
         elif f0_method == "crepe":
@@ -157,6 +152,40 @@ class Pipeline(object):
                 del self.model_rmvpe.model
                 del self.model_rmvpe
                 logger.info("Cleaning ortruntime memory")
+        return f0
+
+    def get_f0(
+        self,
+        input_audio_path,
+        x,
+        p_len,
+        f0_up_key,
+        f0_method,
+        filter_radius,
+        inp_f0=None,
+        audio_key=None,
+    ):
+        f0_min = 50
+        f0_max = 1100
+        f0_mel_min = 1127 * np.log(1 + f0_min / 700)
+        f0_mel_max = 1127 * np.log(1 + f0_max / 700)
+        # The pitch track depends only on the audio and the extraction
+        # settings, so every transpose and voice trial can share it
+        key = (
+            audio_key or audio_hash(x),
+            f0_method,
+            p_len,
+            f0_min,
+            f0_max,
+            (filter_radius > 2, self.f0_workers) if f0_method == "harvest" else None,
+            self.is_half if f0_method in ("crepe", "rmvpe") else None,
+        )
+        f0 = f0_cache.get(key)
+        if f0 is None:
+            f0 = f0_cache.put(
+                key, self.compute_f0(x, p_len, f0_method, filter_radius, f0_min, f0_max)
+            )
+        f0 = f0.copy()
 
         f0 *= pow(2, f0_up_key / 12)
         # with open("test.txt","w")as f:f.write("\n".join([str(i)for i in f0.tolist()]))
@@ -183,21 +212,20 @@ class Pipeline(object):
         f0_coarse = np.rint(f0_mel).astype(np.int32)
         return f0_coarse, f0bak  # 1-0
 
-    def vc(
-        self,
-        model,
-        net_g,
-        sid,
-        audio0,
-        pitch,
-        pitchf,
-        times,
-        index,
-        big_npy,
-        index_rate,
-        version,
-        protect,
-    ):  # ,file_index,file_big_npy
+    def extract_features(self, model, audio0, version, segment=None):
+        """HuBERT features of audio0 for the given model version.
+
+        segment is (audio hash, start, end) of audio0 within the padded input;
+        when given, the features are served from and stored in feature_cache.
+        """
+        feats_key = None
+        if segment is not None:
+            feats_key = segment + (9 if version == "v1" else 12, self.is_half)
+            cached = feature_cache.get(feats_key)
+            if cached is not None:
+                feats = torch.from_numpy(cached.copy()).to(self.device)
+                return feats.half() if self.is_half else feats.float()
+
         feats = torch.from_numpy(audio0)
         if self.is_half:
             feats = feats.half()
@@ -214,10 +242,33 @@ class Pipeline(object):
             "padding_mask": padding_mask,
             "output_layer": 9 if version == "v1" else 12,
         }
-        t0 = ttime()
         with torch.no_grad():
             logits = model.extract_features(**inputs)
             feats = model.final_proj(logits[0]) if version == "v1" else logits[0]
+        if feats_key is not None:
+            feature_cache.put(feats_key, feats.cpu().numpy())
+        return feats
+
+    def vc_features(
+        self,
+        model,
+        audio0,
+        pitch,
+        pitchf,
+        times,
+        index,
+        big_npy,
+        index_rate,
+        version,
+        protect,
+        segment=None,
+        feats=None,
+    ):
+        """Synthesizer inputs for one segment: retrieved, upsampled and
+        protected features plus the frame count and matching pitch"""
+        t0 = ttime()
+        if feats is None:
+            feats = self.extract_features(model, audio0, version, segment)
         if protect < 0.5 and pitch is not None and pitchf is not None:
             feats0 = feats.clone()
         if (
@@ -249,7 +300,6 @@ class Pipeline(object):
             feats0 = F.interpolate(feats0.permute(0, 2, 1), scale_factor=2).permute(
                 0, 2, 1
             )
-        t1 = ttime()
         p_len = audio0.shape[0] // self.window
         if feats.shape[1] < p_len:
             p_len = feats.shape[1]
@@ -264,41 +314,172 @@ class Pipeline(object):
             pitchff = pitchff.unsqueeze(-1)
             feats = feats * pitchff + feats0 * (1 - pitchff)
             feats = feats.to(feats0.dtype)
+        times[0] += ttime() - t0
+        return feats, p_len, pitch, pitchf
+
+    def vc(
+        self,
+        model,
+        net_g,
+        sid,
+        audio0,
+        pitch,
+        pitchf,
+        times,
+        index,
+        big_npy,
+        index_rate,
+        version,
+        protect,
+        segment=None,
+        feats=None,
+    ):  # ,file_index,file_big_npy
+        feats, p_len, pitch, pitchf = self.vc_features(
+            model,
+            audio0,
+            pitch,
+            pitchf,
+            times,
+            index,
+            big_npy,
+            index_rate,
+            version,
+            protect,
+            segment,
+            feats,
+        )
+        t1 = ttime()
         p_len = torch.tensor([p_len], device=self.device).long()
         with torch.no_grad():
             hasp = pitch is not None and pitchf is not None
             arg = (feats, p_len, pitch, pitchf, sid) if hasp else (feats, p_len, sid)
             audio1 = (net_g.infer(*arg)[0][0, 0]).data.cpu().float().numpy()
             del hasp, arg
-        del feats, p_len, padding_mask
+        del feats, p_len
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
         t2 = ttime()
-        times[0] += t1 - t0
         times[2] += t2 - t1
         return audio1
 
-    def pipeline(
+    def vc_batch(
         self,
         model,
         net_g,
         sid,
-        audio,
-        input_audio_path,
+        batch,
         times,
-        f0_up_key,
-        f0_method,
-        file_index,
+        index,
+        big_npy,
         index_rate,
-        if_f0,
-        filter_radius,
-        tgt_sr,
-        resample_sr,
-        rms_mix_rate,
         version,
         protect,
-        f0_file=None,
     ):
+        """vc for several segments with a single net_g.infer call.
+
+        batch holds (audio0, pitch, pitchf, segment, feats) per segment.
+        Shorter segments are zero-padded to the longest one and masked
+        through phone_lengths, so every output matches what vc would
+        return for that segment alone. HuBERT still runs per segment: its
+        first convolution is group-normalised over the whole time axis, so
+        padding would change the features.
+        """
+        items = [
+            self.vc_features(
+                model,
+                audio0,
+                pitch,
+                pitchf,
+                times,
+                index,
+                big_npy,
+                index_rate,
+                version,
+                protect,
+                segment,
+                feats,
+            )
+            for audio0, pitch, pitchf, segment, feats in batch
+        ]
+        t1 = ttime()
+        frames = [feats.shape[1] for feats, _, _, _ in items]
+        max_frames = max(frames)
+
+        def pad(x):
+            return F.pad(x, (0, max_frames - x.shape[1]))
+
+        feats = torch.cat(
+            [
+                F.pad(feats, (0, 0, 0, max_frames - feats.shape[1]))
+                for feats, _, _, _ in items
+            ]
+        )
+        p_len = torch.tensor([p_len for _, p_len, _, _ in items], device=self.device)
+        hasp = items[0][2] is not None and items[0][3] is not None
+        sid = sid.repeat(len(items))
+        with torch.no_grad():
+            if hasp:
+                pitch = torch.cat([pad(pitch) for _, _, pitch, _ in items])
+                pitchf = torch.cat([pad(pitchf) for _, _, _, pitchf in items])
+                arg = (feats, p_len.long(), pitch, pitchf, sid)
+            else:
+                arg = (feats, p_len.long(), sid)
+            audio = net_g.infer(*arg)[0][:, 0].data.cpu().float().numpy()
+            del arg
+        hop = audio.shape[1] // max_frames
+        audio1 = [audio[i, : n * hop] for i, n in enumerate(frames)]
+        del feats, p_len, audio
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        times[2] += ttime() - t1
+        return audio1
+
+    def get_pitch(
+        self,
+        input_audio_path,
+        x,
+        p_len,
+        f0_up_key,
+        f0_method,
+        filter_radius,
+        inp_f0=None,
+        audio_key=None,
+    ):
+        """get_f0 for x, as (1, p_len) coarse and fine pitch tensors"""
+        pitch, pitchf = self.get_f0(
+            input_audio_path,
+            x,
+            p_len,
+            f0_up_key,
+            f0_method,
+            filter_radius,
+            inp_f0,
+            audio_key,
+        )
+        pitch = pitch[:p_len]
+        pitchf = pitchf[:p_len]
+        if "mps" not in str(self.device) or "xpu" not in str(self.device):
+            pitchf = pitchf.astype(np.float32)
+        pitch = torch.tensor(pitch, device=self.device).unsqueeze(0).long()
+        pitchf = torch.tensor(pitchf, device=self.device).unsqueeze(0).float()
+        return pitch, pitchf
+
+    @staticmethod
+    def length_buckets(segments, batch_size, min_ratio=0.75):
+        """Group neighbouring segments into batches of up to batch_size whose
+        lengths stay within min_ratio of the longest, to bound padding"""
+        batches = []
+        for segment in segments:
+            n = segment[0].shape[0]
+            if batches and len(batches[-1]) < batch_size:
+                lengths = [item[0].shape[0] for item in batches[-1]] + [n]
+                if min(lengths) >= min_ratio * max(lengths):
+                    batches[-1].append(segment)
+                    continue
+            batches.append([segment])
+        return batches
+
+    def load_index(self, file_index, index_rate):
         if (
             file_index != ""
             # and file_big_npy != ""
@@ -307,33 +488,38 @@ class Pipeline(object):
             and index_rate != 0
         ):
             try:
-                index = faiss.read_index(file_index)
-                # big_npy = np.load(file_big_npy)
-                big_npy = index.reconstruct_n(0, index.ntotal)
+                return index_cache.get(file_index)
             except:
                 traceback.print_exc()
-                index = big_npy = None
-        else:
-            index = big_npy = None
+        return None, None
+
+    def prepare(
+        self,
+        audio,
+        input_audio_path,
+        times,
+        f0_up_key,
+        f0_method,
+        if_f0,
+        filter_radius,
+        f0_file=None,
+        pitch_executor=None,
+    ):
+        """Run the voice-independent front end of the conversion.
+
+        Filters the input, picks the split points and extracts F0. The
+        returned dict is read-only to synthesize and can be shared by any
+        number of voices. With a pitch_executor, F0 is submitted to it
+        instead of computed inline, and overlap_features must resolve it
+        before the front end is used.
+        """
         audio = signal.filtfilt(bh, ah, audio)
         audio_pad = np.pad(audio, (self.window // 2, self.window // 2), mode="reflect")
         opt_ts = []
         if audio_pad.shape[0] > self.t_max:
-            audio_sum = np.zeros_like(audio)
-            for i in range(self.window):
-                audio_sum += np.abs(audio_pad[i : i - self.window])
-            for t in range(self.t_center, audio.shape[0], self.t_center):
-                opt_ts.append(
-                    t
-                    - self.t_query
-                    + np.where(
-                        audio_sum[t - self.t_query : t + self.t_query]
-                        == audio_sum[t - self.t_query : t + self.t_query].min()
-                    )[0][0]
-                )
-        s = 0
-        audio_opt = []
-        t = None
+            opt_ts = find_split_points(
+                audio_pad, audio.shape[0], self.window, self.t_center, self.t_query
+            )
         t1 = ttime()
         audio_pad = np.pad(audio, (self.t_pad, self.t_pad), mode="reflect")
         p_len = audio_pad.shape[0] // self.window
@@ -348,10 +534,10 @@ class Pipeline(object):
                 inp_f0 = np.array(inp_f0, dtype="float32")
             except:
                 traceback.print_exc()
-        sid = torch.tensor(sid, device=self.device).unsqueeze(0).long()
-        pitch, pitchf = None, None
+        audio_key = audio_hash(audio_pad)
+        pitch, pitchf, pitch_job = None, None, None
         if if_f0 == 1:
-            pitch, pitchf = self.get_f0(
+            args = (
                 input_audio_path,
                 audio_pad,
                 p_len,
@@ -359,89 +545,167 @@ class Pipeline(object):
                 f0_method,
                 filter_radius,
                 inp_f0,
+                audio_key,
             )
-            pitch = pitch[:p_len]
-            pitchf = pitchf[:p_len]
-            if "mps" not in str(self.device) or "xpu" not in str(self.device):
-                pitchf = pitchf.astype(np.float32)
-            pitch = torch.tensor(pitch, device=self.device).unsqueeze(0).long()
-            pitchf = torch.tensor(pitchf, device=self.device).unsqueeze(0).float()
+            if pitch_executor is not None:
+                pitch_job = pitch_executor.submit(self.timed_pitch, *args)
+            else:
+                pitch, pitchf = self.get_pitch(*args)
         t2 = ttime()
         times[1] += t2 - t1
+        # (start, end) in audio_pad and the matching frame range of the
+        # pitch track for every segment; the last one runs to the end
+        segments = []
+        s = 0
         for t in opt_ts:
             t = t // self.window * self.window
-            if if_f0 == 1:
-                audio_opt.append(
-                    self.vc(
+            segments.append(
+                (
+                    s,
+                    t + self.t_pad2 + self.window,
+                    s // self.window,
+                    (t + self.t_pad2) // self.window,
+                )
+            )
+            s = t
+        segments.append((s, audio_pad.shape[0], s // self.window, None))
+        return {
+            "audio": audio,
+            "audio_pad": audio_pad,
+            "audio_key": audio_key,
+            "segments": segments,
+            "pitch": pitch,
+            "pitchf": pitchf,
+            "pitch_job": pitch_job,
+        }
+
+    def segment_features(self, model, front, version):
+        """HuBERT features for every segment of a prepared input"""
+        audio_pad, audio_key = front["audio_pad"], front["audio_key"]
+        return [
+            self.extract_features(model, audio_pad[s:e], version, (audio_key, s, e))
+            for s, e, _, _ in front["segments"]
+        ]
+
+    def timed_pitch(self, *args):
+        t0 = ttime()
+        pitch, pitchf = self.get_pitch(*args)
+        return pitch, pitchf, t0, ttime()
+
+    def overlap_features(self, model, front, version, times):
+        """Extract HuBERT features for leading segments while F0 runs.
+
+        Checks the pitch job of a front end prepared with a pitch_executor
+        at every segment boundary; once it is done, stores its result in
+        front and returns the features computed so far (None for the rest)
+        for synthesize. times[3], if present, collects the seconds the two
+        stages ran concurrently.
+        """
+        job = front.pop("pitch_job", None)
+        if job is None:
+            return None
+        audio_pad, audio_key = front["audio_pad"], front["audio_key"]
+        feats = [None] * len(front["segments"])
+        t0 = ttime()
+        for i, (s, e, _, _) in enumerate(front["segments"]):
+            if job.done():
+                break
+            feats[i] = self.extract_features(
+                model, audio_pad[s:e], version, (audio_key, s, e)
+            )
+        t1 = ttime()
+        front["pitch"], front["pitchf"], f0_start, f0_end = job.result()
+        times[0] += t1 - t0
+        times[1] += f0_end - f0_start
+        if len(times) > 3:
+            times[3] += max(0, min(t1, f0_end) - max(t0, f0_start))
+        return feats
+
+    def synthesize(
+        self,
+        model,
+        net_g,
+        sid,
+        front,
+        times,
+        index,
+        big_npy,
+        index_rate,
+        if_f0,
+        tgt_sr,
+        resample_sr,
+        rms_mix_rate,
+        version,
+        protect,
+        feats=None,
+        batch_size=None,
+    ):
+        """Run one voice over a prepared input and return int16 audio.
+
+        feats optionally holds precomputed features from segment_features.
+        With a batch_size above 1 (config.vc_batch_size by default),
+        neighbouring segments of similar length go through net_g together
+        via vc_batch.
+        """
+        sid = torch.tensor(sid, device=self.device).unsqueeze(0).long()
+        audio_pad = front["audio_pad"]
+        pitch, pitchf = (
+            (front["pitch"], front["pitchf"]) if if_f0 == 1 else (None, None)
+        )
+        segments = [
+            (
+                audio_pad[s:e],
+                pitch[:, f0_s:f0_e] if pitch is not None else None,
+                pitchf[:, f0_s:f0_e] if pitchf is not None else None,
+                (front["audio_key"], s, e),
+                feats[i] if feats is not None else None,
+            )
+            for i, (s, e, f0_s, f0_e) in enumerate(front["segments"])
+        ]
+        batch_size = batch_size or self.batch_size
+        audio_opt = []
+        if batch_size > 1:
+            for batch in self.length_buckets(segments, batch_size):
+                audio_opt.extend(
+                    audio1[self.t_pad_tgt : -self.t_pad_tgt]
+                    for audio1 in self.vc_batch(
                         model,
                         net_g,
                         sid,
-                        audio_pad[s : t + self.t_pad2 + self.window],
-                        pitch[:, s // self.window : (t + self.t_pad2) // self.window],
-                        pitchf[:, s // self.window : (t + self.t_pad2) // self.window],
+                        batch,
                         times,
                         index,
                         big_npy,
                         index_rate,
                         version,
                         protect,
-                    )[self.t_pad_tgt : -self.t_pad_tgt]
+                    )
                 )
-            else:
+        else:
+            for audio0, pitch0, pitchf0, segment, feats0 in segments:
                 audio_opt.append(
                     self.vc(
                         model,
                         net_g,
                         sid,
-                        audio_pad[s : t + self.t_pad2 + self.window],
-                        None,
-                        None,
+                        audio0,
+                        pitch0,
+                        pitchf0,
                         times,
                         index,
                         big_npy,
                         index_rate,
                         version,
                         protect,
+                        segment,
+                        feats0,
                     )[self.t_pad_tgt : -self.t_pad_tgt]
                 )
-            s = t
-        if if_f0 == 1:
-            audio_opt.append(
-                self.vc(
-                    model,
-                    net_g,
-                    sid,
-                    audio_pad[t:],
-                    pitch[:, t // self.window :] if t is not None else pitch,
-                    pitchf[:, t // self.window :] if t is not None else pitchf,
-                    times,
-                    index,
-                    big_npy,
-                    index_rate,
-                    version,
-                    protect,
-                )[self.t_pad_tgt : -self.t_pad_tgt]
-            )
-        else:
-            audio_opt.append(
-                self.vc(
-                    model,
-                    net_g,
-                    sid,
-                    audio_pad[t:],
-                    None,
-                    None,
-                    times,
-                    index,
-                    big_npy,
-                    index_rate,
-                    version,
-                    protect,
-                )[self.t_pad_tgt : -self.t_pad_tgt]
-            )
         audio_opt = np.concatenate(audio_opt)
         if rms_mix_rate != 1:
-            audio_opt = change_rms(audio, 16000, audio_opt, tgt_sr, rms_mix_rate)
+            audio_opt = change_rms(
+                front["audio"], 16000, audio_opt, tgt_sr, rms_mix_rate
+            )
         if tgt_sr != resample_sr >= 16000:
             audio_opt = librosa.resample(
                 audio_opt, orig_sr=tgt_sr, target_sr=resample_sr
@@ -455,3 +719,194 @@ class Pipeline(object):
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
         return audio_opt
+
+    def pipeline(
+        self,
+        model,
+        net_g,
+        sid,
+        audio,
+        input_audio_path,
+        times,
+        f0_up_key,
+        f0_method,
+        file_index,
+        index_rate,
+        if_f0,
+        filter_radius,
+        tgt_sr,
+        resample_sr,
+        rms_mix_rate,
+        version,
+        protect,
+        f0_file=None,
+    ):
+        index, big_npy = self.load_index(file_index, index_rate)
+        # F0 runs on a worker thread while HuBERT handles the first segments
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            front = self.prepare(
+                audio,
+                input_audio_path,
+                times,
+                f0_up_key,
+                f0_method,
+                if_f0,
+                filter_radius,
+                f0_file,
+                executor,
+            )
+            feats = self.overlap_features(model, front, version, times)
+        return self.synthesize(
+            model,
+            net_g,
+            sid,
+            front,
+            times,
+            index,
+            big_npy,
+            index_rate,
+            if_f0,
+            tgt_sr,
+            resample_sr,
+            rms_mix_rate,
+            version,
+            protect,
+            feats,
+        )
+
+    def pipeline_stream(
+        self,
+        model,
+        net_g,
+        sid,
+        chunks,
+        times,
+        f0_up_key,
+        f0_method,
+        file_index,
+        index_rate,
+        if_f0,
+        filter_radius,
+        tgt_sr,
+        resample_sr,
+        rms_mix_rate,
+        version,
+        protect,
+    ):
+        """Convert an iterable of 16 kHz float32 chunks, yielding int16 blocks.
+
+        Cuts at the same t_center/t_query split points as pipeline, but
+        decides each one as soon as enough input has arrived and converts
+        that segment with its t_pad context right away, so only about
+        t_center + t_query + 2 * t_pad samples are held at any time.
+        Filtering, F0, the RMS mix and resampling run per segment and blocks
+        are clipped instead of normalised against the whole track, so the
+        output differs slightly from pipeline around segment edges. f0 files
+        are not supported.
+        """
+        index, big_npy = self.load_index(file_index, index_rate)
+        sid = torch.tensor(sid, device=self.device).unsqueeze(0).long()
+        chunks = iter(chunks)
+        half = self.window // 2
+        # Input before this point has been converted; keep enough of it to
+        # give the high-pass filter and the next segment their context
+        context = self.t_pad + self.sr // 2
+        buf = np.zeros(0, dtype=np.float32)
+        base = 0  # position of buf[0] in the input
+        n = 0  # samples received so far
+        ended = False
+        s = 0
+        center = self.t_center
+        while True:
+            pending = [buf]
+            need = center + self.t_query + self.t_pad + self.window
+            while not ended and n < need:
+                try:
+                    pending.append(np.asarray(next(chunks), dtype=np.float32))
+                    n += pending[-1].shape[0]
+                except StopIteration:
+                    ended = True
+            buf = np.concatenate(pending)
+            if n == 0:
+                return
+            filt = signal.filtfilt(bh, ah, buf)
+            if ended:
+                # Same reflection as the padding pipeline applies to the tail
+                filt = np.pad(filt, (0, self.t_pad), mode="reflect")
+
+            # pipeline only splits inputs longer than t_max
+            last = ended and (center >= n or (s == 0 and n + self.window <= self.t_max))
+            if last:
+                t = n
+                e = n + self.t_pad
+            else:
+                lo = center - self.t_query
+                hi = min(center + self.t_query, n)
+                local = filt[lo - half - base : hi + half - base]
+                t = (
+                    lo
+                    + find_split_points(
+                        local, hi - lo, self.window, self.t_query, self.t_query
+                    )[0]
+                )
+                t = t // self.window * self.window
+                e = t + self.t_pad + self.window
+
+            t1 = ttime()
+            audio_pad = filt[max(s - self.t_pad, 0) - base : e - base]
+            if s == 0:
+                audio_pad = np.pad(audio_pad, (self.t_pad, 0), mode="reflect")
+            p_len = audio_pad.shape[0] // self.window
+            audio_key = audio_hash(audio_pad)
+            pitch, pitchf = None, None
+            if if_f0 == 1:
+                pitch, pitchf = self.get_pitch(
+                    None,
+                    audio_pad,
+                    p_len,
+                    f0_up_key,
+                    f0_method,
+                    filter_radius,
+                    None,
+                    audio_key,
+                )
+            times[1] += ttime() - t1
+            audio_opt = self.vc(
+                model,
+                net_g,
+                sid,
+                audio_pad,
+                pitch,
+                pitchf,
+                times,
+                index,
+                big_npy,
+                index_rate,
+                version,
+                protect,
+                (audio_key, 0, audio_pad.shape[0]),
+            )[self.t_pad_tgt : -self.t_pad_tgt]
+            if rms_mix_rate != 1:
+                audio_opt = change_rms(
+                    filt[s - base : min(e - self.t_pad, n) - base],
+                    16000,
+                    audio_opt,
+                    tgt_sr,
+                    rms_mix_rate,
+                )
+            if tgt_sr != resample_sr >= 16000:
+                audio_opt = librosa.resample(
+                    audio_opt, orig_sr=tgt_sr, target_sr=resample_sr
+                )
+            yield np.clip(audio_opt * 32768, -32768, 32767).astype(np.int16)
+            if last:
+                break
+
+            s = t
+            center += self.t_center
+            keep = max(s - context, base)
+            buf = buf[keep - base :]
+            base = keep
+        del pitch, pitchf, sid
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
@@ -0,0 +1,116 @@
+"""
+Per-file decode overhead of load_audio on short clips.
+
+Writes a set of short stereo clips (wav, flac, mp3) and times the in-process
+PyAV decoder in infer.lib.audio against the previous ffmpeg CLI subprocess,
+which is skipped when ffmpeg is not on PATH. Also reports how far the two
+decodes differ.
+
+Usage: python tools/benchmark_load_audio.py --seconds 3 --files 50
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from time import time as ttime
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+import av
+import numpy as np
+
+from infer.lib.audio import load_audio
+
+
+def legacy_load_audio(file, sr):
+    """The previous ffmpeg subprocess decoder"""
+    import ffmpeg
+
+    out, _ = (
+        ffmpeg.input(file, threads=0)
+        .output("-", format="f32le", acodec="pcm_f32le", ac=1, ar=sr)
+        .run(cmd=["ffmpeg", "-nostdin"], capture_stdout=True, capture_stderr=True)
+    )
+    return np.frombuffer(out, np.float32).flatten()
+
+
+def write_clip(path, codec, seconds, rate=44100, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(t.size)
+    samples = np.stack([tone, np.roll(tone, 100)]).astype(np.float32)
+
+    with av.open(path, "w") as out:
+        stream = out.add_stream(codec, rate=rate, layout="stereo")
+        frame_size = stream.codec_context.frame_size or 1024
+        fmt = stream.codec_context.format.name
+        for start in range(0, samples.shape[1], frame_size):
+            block = samples[:, start : start + frame_size]
+            frame = av.AudioFrame.from_ndarray(
+                np.ascontiguousarray(block), format="fltp", layout="stereo"
+            )
+            frame.rate = rate
+            frame.pts = start
+            if fmt != "fltp":
+                frame = av.AudioResampler(
+                    format=fmt, layout="stereo", rate=rate
+                ).resample(frame)[0]
+            for packet in stream.encode(frame):
+                out.mux(packet)
+        for packet in stream.encode(None):
+            out.mux(packet)
+
+
+def bench(fn, paths, sr):
+    t0 = ttime()
+    outs = [fn(path, sr) for path in paths]
+    return (ttime() - t0) / len(paths), outs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--sr", type=int, default=16000)
+    args = parser.parse_args()
+
+    has_cli = shutil.which("ffmpeg") is not None
+    tmp = tempfile.mkdtemp()
+    try:
+        for ext, codec in (("wav", "pcm_s16le"), ("flac", "flac"), ("mp3", "mp3")):
+            path = os.path.join(tmp, "clip.%s" % ext)
+            try:
+                write_clip(path, codec, args.seconds)
+            except Exception as e:
+                print("%-5s skipped, cannot encode: %s" % (ext, e))
+                continue
+            paths = [path] * args.files
+
+            t_new, outs = bench(load_audio, paths, args.sr)
+            line = "%-5s pyav %.2f ms/file" % (ext, t_new * 1000)
+            if has_cli:
+                t_old, refs = bench(legacy_load_audio, paths, args.sr)
+                ref, out = refs[0], outs[0]
+                n = min(len(ref), len(out))
+                line += (
+                    "  ffmpeg cli %.2f ms/file (%.1fx)  %d vs %d samples, max diff %.2e"
+                    % (
+                        t_old * 1000,
+                        t_old / t_new,
+                        len(out),
+                        len(ref),
+                        np.abs(ref[:n] - out[:n]).max(),
+                    )
+                )
+            print(line)
+        if not has_cli:
+            print("ffmpeg CLI not found, legacy decoder not timed")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Regression check and timing for chunked, multi-process harvest/dio F0.
+
+Runs infer.lib.world_f0.chunked_world_f0 against the serial world_f0 on a
+synthetic 16 kHz vocal-like signal (gliding harmonic tones with vibrato,
+separated by breaths and silence) and fails if the stitched contour
+disagrees with the serial one beyond tolerance.
+
+Usage: python tools/benchmark_world_f0.py --seconds 120 --workers 4
+"""
+
+import argparse
+import os
+import sys
+from time import time as ttime
+
+now_dir = os.getcwd()
+sys.path.append(now_dir)
+
+import numpy as np
+
+from infer.lib.world_f0 import chunked_world_f0, world_f0
+
+SR = 16000
+
+
+def make_vocal(seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SR)
+    audio = np.zeros(n)
+    pos = 0
+    while pos < n:
+        length = min(int(rng.uniform(1.0, 4.0) * SR), n - pos)
+        t = np.arange(length) / SR
+        base = rng.uniform(110, 440)
+        glide = base * (1 + rng.uniform(-0.2, 0.2) * t / max(t[-1], 1e-3))
+        f0 = glide * (1 + 0.01 * np.sin(2 * np.pi * 5.5 * t))
+        phase = 2 * np.pi * np.cumsum(f0) / SR
+        note = sum(np.sin(k * phase) / k for k in range(1, 6))
+        fade = np.minimum(1, np.minimum(t, t[-1] - t) * 20)
+        audio[pos : pos + length] = 0.3 * note * fade
+        pos += length
+        gap = min(int(rng.uniform(0.1, 0.6) * SR), max(n - pos, 0))
+        audio[pos : pos + gap] = rng.standard_normal(gap) * 0.003
+        pos += gap
+    return audio
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=120)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--method", type=str, default="harvest")
+    # Fraction of frames allowed to differ by more than 1% (voicing flips
+    # count as differences)
+    parser.add_argument("--tolerance", type=float, default=0.01)
+    args = parser.parse_args()
+
+    audio = make_vocal(args.seconds)
+    kwargs = dict(fs=SR, f0_floor=50, f0_ceil=1100, frame_period=10)
+
+    t0 = ttime()
+    serial = world_f0(audio, method=args.method, **kwargs)
+    t1 = ttime()
+    # The first call also starts the worker processes
+    chunked_world_f0(
+        audio[: 20 * SR], method=args.method, n_workers=args.workers, **kwargs
+    )
+    t2 = ttime()
+    stitched = chunked_world_f0(
+        audio, method=args.method, n_workers=args.workers, **kwargs
+    )
+    t3 = ttime()
+
+    if serial.shape != stitched.shape:
+        print("FAIL: %d frames serial vs %d stitched" % (serial.size, stitched.size))
+        sys.exit(1)
+    rel = np.abs(stitched - serial) / np.maximum(serial, 1)
+    mismatch = np.mean(rel > 0.01)
+    print("%s, %.0fs of audio, %d frames" % (args.method, args.seconds, serial.size))
+    print("serial:   %.2fs" % (t1 - t0))
+    print("%d workers: %.2fs (%.1fx)" % (args.workers, t3 - t2, (t1 - t0) / (t3 - t2)))
+    print(
+        "frames differing by >1%%: %.3f%% (tolerance %.3f%%)"
+        % (mismatch * 100, args.tolerance * 100)
+    )
+    if mismatch > args.tolerance:
+        print("FAIL: stitched F0 drifts from the serial contour")
+        sys.exit(1)
+    print("stitched F0 matches the serial contour")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark for MusicalAnalyzer.analyze_harmonic_content in musical-analyzer.py
+Compares single-pass key detection against the original per-chord key analysis
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+from music21 import analysis, chord, meter, roman, stream
+
+def load_musical_analyzer():
+    """Import server/musical-analyzer.py despite the hyphenated filename"""
+    module_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'musical-analyzer.py')
+    spec = importlib.util.spec_from_file_location('musical_analyzer', module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def legacy_roman_numerals(composition_stream):
+    """The original loop: a full key analysis of the score for every chord"""
+    roman_numerals = []
+    for element in composition_stream.flat:
+        if isinstance(element, chord.Chord):
+            try:
+                rn = roman.romanNumeralFromChord(element, composition_stream.analyze('key'))
+                function = analysis.harmonicFunction.romanToFunction(rn)
+                roman_numerals.append({
+                    'roman': str(rn),
+                    'figure': rn.figure,
+                    'function': str(function) if function else None
+                })
+            except:
+                pass
+    return roman_numerals
+
+def build_score(measures, chords_per_measure):
+    """A 4/4 chorale-style part cycling through a diatonic progression in C"""
+    progression = [
+        ['C4', 'E4', 'G4'], ['A3', 'C4', 'E4'], ['F3', 'A3', 'C4'], ['G3', 'B3', 'D4'],
+        ['D4', 'F4', 'A4'], ['E3', 'G3', 'B3'], ['F3', 'A3', 'C4'], ['G3', 'B3', 'D4', 'F4']
+    ]
+    part = stream.Part()
+    for m in range(measures):
+        measure = stream.Measure(number=m + 1)
+        if m == 0:
+            measure.append(meter.TimeSignature('4/4'))
+        for c in range(chords_per_measure):
+            pitches = progression[(m * chords_per_measure + c) % len(progression)]
+            measure.append(chord.Chord(pitches, quarterLength=4 / chords_per_measure))
+        part.append(measure)
+    score = stream.Score()
+    score.insert(0, part)
+    return score
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark harmonic analysis key detection')
+    parser.add_argument('--measures', type=int, default=300)
+    parser.add_argument('--chords-per-measure', type=int, default=2)
+    args = parser.parse_args()
+
+    module = load_musical_analyzer()
+    analyzer = module.MusicalAnalyzer(module.AnalysisConfig(detailed_chord_analysis=True))
+    score = build_score(args.measures, args.chords_per_measure)
+    print(f"Score: {args.measures} measures, {args.measures * args.chords_per_measure} chords")
+
+    start = time.perf_counter()
+    expected = legacy_roman_numerals(score)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = analyzer.analyze_harmonic_content(score)
+    new_time = time.perf_counter() - start
+
+    print(f"Per-chord key analysis:  {legacy_time:.2f}s (roman numerals only)")
+    print(f"analyze_harmonic_content: {new_time:.2f}s (full harmonic analysis)")
+    print(f"Speedup: {legacy_time / new_time:.1f}x")
+
+    if result['roman_numerals'] != expected:
+        print("FAIL: roman numerals differ from the per-chord key analysis")
+        sys.exit(1)
+    print(f"Roman numerals identical ({len(expected)} chords)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the raw SMF scanner in midi-analyzer.py
+Writes large multi-track MIDI files with mido and compares scan_midi against
+the full mido parse used by MIDIAnalyzer.read_with_mido, for speed and for
+identical summaries
+"""
+
+import argparse
+import importlib.util
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import mido
+
+def load_midi_analyzer():
+    """Import server/midi-analyzer.py despite the hyphenated filename"""
+    module_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'midi-analyzer.py')
+    spec = importlib.util.spec_from_file_location('midi_analyzer', module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def write_midi(path, tracks, notes_per_track, seed=0):
+    """Type 1 file: a conductor track with tempo, meter and key changes, then
+    instrument tracks mixing notes, controllers, pitch bends, sysex and text"""
+    mid = mido.MidiFile(type=1, ticks_per_beat=480)
+    conductor = mido.MidiTrack()
+    conductor.append(mido.MetaMessage('track_name', name='Conductor'))
+    conductor.append(mido.MetaMessage('time_signature', numerator=4, denominator=4))
+    conductor.append(mido.MetaMessage('key_signature', key='Eb'))
+    for change in range(notes_per_track // 256):
+        conductor.append(mido.MetaMessage('set_tempo', tempo=mido.bpm2tempo(90 + change % 60), time=480 * 16))
+    conductor.append(mido.MetaMessage('time_signature', numerator=6, denominator=8, time=480))
+    conductor.append(mido.MetaMessage('key_signature', key='F#m'))
+    mid.tracks.append(conductor)
+
+    for t in range(tracks):
+        track = mido.MidiTrack()
+        channel = t % 16
+        track.append(mido.MetaMessage('track_name', name=f'Track {t}'))
+        track.append(mido.Message('program_change', channel=channel, program=(seed + t) % 128))
+        track.append(mido.Message('sysex', data=[0x7E, 0x7F, 0x09, 0x01]))
+        for i in range(notes_per_track):
+            pitch = 36 + (i * 7 + t * 5) % 60
+            track.append(mido.Message('note_on', channel=channel, note=pitch, velocity=40 + i % 80, time=120))
+            if i % 16 == 0:
+                track.append(mido.Message('control_change', channel=channel, control=7, value=i % 128))
+                track.append(mido.Message('pitchwheel', channel=channel, pitch=(i * 37) % 16000 - 8000))
+                track.append(mido.Message('aftertouch', channel=channel, value=i % 128))
+            if i % 500 == 0:
+                track.append(mido.MetaMessage('marker', text=f'Section {i // 500}'))
+            # Alternate note_off messages and zero-velocity note_ons
+            if i % 2:
+                track.append(mido.Message('note_off', channel=channel, note=pitch, time=240))
+            else:
+                track.append(mido.Message('note_on', channel=channel, note=pitch, velocity=0, time=240))
+        mid.tracks.append(track)
+    mid.save(path)
+
+def same_summary(a, b):
+    return all(a[k] == b[k] for k in a if k != 'length') and math.isclose(a['length'], b['length'], rel_tol=1e-9)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the raw MIDI scanner')
+    parser.add_argument('--tracks', type=int, default=16)
+    parser.add_argument('--notes', type=int, default=20000, help='Notes per track')
+    parser.add_argument('--files', nargs='*', default=[], help='Extra MIDI files to check')
+    args = parser.parse_args()
+
+    module = load_midi_analyzer()
+    analyzer = module.MIDIAnalyzer()
+    tmp = tempfile.mkdtemp()
+    failed = False
+    try:
+        path = os.path.join(tmp, 'large.mid')
+        write_midi(path, args.tracks, args.notes)
+        print(f"{args.tracks} tracks x {args.notes} notes, {os.path.getsize(path) / 2**20:.1f} MiB")
+
+        start = time.perf_counter()
+        expected = analyzer.read_with_mido(path)
+        mido_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scanned = module.scan_midi(path)
+        scan_time = time.perf_counter() - start
+
+        print(f"mido parse: {mido_time:.2f}s  raw scan: {scan_time:.2f}s ({mido_time / scan_time:.1f}x)")
+        print(f"Summary: {scanned}")
+        if not same_summary(scanned, expected):
+            print(f"FAIL: mido summary differs: {expected}")
+            failed = True
+
+        default_test = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test.mid')
+        for extra in args.files + ([default_test] if os.path.exists(default_test) else []):
+            scanned = module.scan_midi(extra)
+            matched = same_summary(scanned, analyzer.read_with_mido(extra))
+            print(f"{extra}: {'matches mido' if matched else 'DIFFERS from mido'}")
+            failed |= not matched
+    finally:
+        shutil.rmtree(tmp)
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the melodic motif search in musical-analyzer.py
+Checks find_maximal_repeats against a brute-force substring scan, checks that a
+motif planted at random transpositions is ranked first, and times the suffix
+array search against the original dictionary of interval tuples
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+def load_musical_analyzer():
+    """Import server/musical-analyzer.py despite the hyphenated filename"""
+    module_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'musical-analyzer.py')
+    spec = importlib.util.spec_from_file_location('musical_analyzer', module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def legacy_motifs(midi, min_length=3, max_length=6):
+    """The original search: every interval tuple of length 3-5 counted in a dict"""
+    intervals = np.diff(midi).tolist()
+    motifs = {}
+    for length in range(min_length, min(max_length, len(intervals))):
+        for i in range(len(intervals) - length + 1):
+            pattern = tuple(intervals[i:i+length])
+            motifs[pattern] = motifs.get(pattern, 0) + 1
+    significant_motifs = [
+        {'intervals': list(pattern), 'count': count, 'length': len(pattern)}
+        for pattern, count in motifs.items()
+        if count > 1
+    ]
+    return sorted(significant_motifs, key=lambda x: (-x['count'], -x['length']))
+
+def brute_force_repeats(sequence, min_length):
+    """Every maximal repeat by direct substring enumeration, with its non-overlapping count"""
+    n = len(sequence)
+    occurrences = {}
+    for start in range(n):
+        for end in range(start + min_length, n + 1):
+            occurrences.setdefault(tuple(sequence[start:end]), []).append(start)
+
+    found = set()
+    for pattern, starts in occurrences.items():
+        if len(starts) < 2:
+            continue
+        length = len(pattern)
+        left = {sequence[p - 1] if p > 0 else ('start', p) for p in starts}
+        right = {sequence[p + length] if p + length < n else ('end', p) for p in starts}
+        if len(left) < 2 or len(right) < 2:
+            continue
+        count, next_free = 0, -1
+        for p in starts:
+            if p >= next_free:
+                count += 1
+                next_free = p + length
+        if count > 1:
+            found.add((pattern, count))
+    return found
+
+def random_melody(n_notes, rng, motif=None, plants=0):
+    """Random-walk melody, optionally with a motif planted at random transpositions"""
+    midi = 36 + np.mod(np.cumsum(rng.integers(-4, 5, n_notes)), 60)
+    if motif is not None:
+        span = len(motif) + 1
+        for slot in rng.choice(n_notes // span, plants, replace=False):
+            start = slot * span
+            midi[start:start + span] = rng.integers(48, 72) + np.concatenate(([0], np.cumsum(motif)))
+    return midi.astype(np.int64)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark melodic motif discovery')
+    parser.add_argument('--notes', type=int, default=20000)
+    parser.add_argument('--large', type=int, default=1000000)
+    args = parser.parse_args()
+
+    module = load_musical_analyzer()
+    analyzer = module.MusicalAnalyzer()
+    rng = np.random.default_rng(0)
+    failed = False
+
+    for trial in range(20):
+        sequence = rng.integers(0, 3, int(rng.integers(2, 120))).tolist()
+        expected = brute_force_repeats(sequence, 2)
+        found = {
+            (tuple(sequence[positions[0]:positions[0] + length]), len(positions))
+            for length, positions in module.find_maximal_repeats(np.array(sequence), 2, top_k=None)
+        }
+        if found != expected:
+            print(f"FAIL: maximal repeats differ from the brute-force scan on {sequence}")
+            failed = True
+            break
+    else:
+        print("Maximal repeats match the brute-force scan on 20 random sequences")
+
+    motif = [2, 2, -4, 5, -1, -2, 7, -3, -3, 1, 2, 0]
+    midi = random_melody(args.notes, rng, np.array(motif), plants=20)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    legacy_motifs(midi)
+    legacy_time = time.perf_counter() - start
+    legacy_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    motifs = analyzer._identify_melodic_motifs(midi)
+    new_time = time.perf_counter() - start
+    new_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    top = motifs[0]['intervals'] if motifs else []
+    planted_first = any(top[i:i + len(motif)] == motif for i in range(len(top) - len(motif) + 1))
+    print(f"{args.notes} notes: interval-tuple dict (lengths 3-5) {legacy_time:.3f}s, peak {legacy_peak / 2**20:.0f} MiB; "
+          f"suffix array (any length) {new_time:.3f}s, peak {new_peak / 2**20:.0f} MiB")
+    print(f"Top motif: {top} x{motifs[0]['count'] if motifs else 0}")
+    if not planted_first:
+        print("FAIL: the planted motif is not the top motif")
+        failed = True
+
+    if args.large:
+        midi = random_melody(args.large, rng, np.array(motif), plants=200)
+        start = time.perf_counter()
+        motifs = analyzer._identify_melodic_motifs(midi)
+        large_time = time.perf_counter() - start
+        # Second run for the memory peak; tracemalloc slows it down
+        tracemalloc.start()
+        analyzer._identify_melodic_motifs(midi)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{args.large} notes: suffix array {large_time:.2f}s, peak {peak / 2**20:.0f} MiB, "
+              f"top motif x{motifs[0]['count'] if motifs else 0}")
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
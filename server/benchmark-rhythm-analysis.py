@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the rhythmic analysis in musical-analyzer.py
+Times the vectorized syncopation, onset histogram and pattern search on a
+large note table, checks the metrical-weight syncopation against a per-note
+grid scan, and times the original off-grid onset loop for comparison
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+import numpy as np
+from music21 import meter
+
+def load_musical_analyzer():
+    """Import server/musical-analyzer.py despite the hyphenated filename"""
+    module_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'musical-analyzer.py')
+    spec = importlib.util.spec_from_file_location('musical_analyzer', module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def legacy_syncopation(durations, onset_times):
+    """The original score: share of onsets off a 16th grid, one np.isclose per onset"""
+    if len(durations) < 3:
+        return 0.0
+
+    beat_positions = np.arange(0, max(onset_times) + 1, 0.25)
+    syncopation_count = 0
+    for onset in onset_times:
+        if not any(np.isclose(onset, beat_positions, atol=0.01)):
+            syncopation_count += 1
+    return syncopation_count / len(onset_times)
+
+def reference_syncopation(module, events, levels):
+    """The same Longuet-Higgins & Lee model, one note and grid point at a time"""
+    tolerance = module.GRID_TOLERANCE
+
+    def weight(t):
+        for k, level in enumerate(levels):
+            if abs(t / level - round(t / level)) * level < tolerance:
+                return -k
+        return -len(levels)
+
+    notes = [row for row in events.tolist() if row[2] >= 0]
+    if len(notes) < 3:
+        return 0.0
+    total = 0
+    by_part = {}
+    for onset, length, _, _, part, _ in notes:
+        by_part.setdefault(part, []).append((onset, length))
+    for part_notes in by_part.values():
+        part_notes.sort()
+        for i, (onset, length) in enumerate(part_notes):
+            later = [t for t, _ in part_notes[i + 1:] if t > onset + tolerance]
+            end = later[0] if later else onset + length
+            finest = levels[-1]
+            grid = (np.floor((onset + tolerance) / finest) + 1) * finest
+            strongest = -len(levels) - 1
+            while grid < end - tolerance:
+                strongest = max(strongest, weight(grid))
+                grid += finest
+            total += max(strongest - weight(onset), 0)
+    return total / len(notes)
+
+def build_note_table(module, n_notes, n_parts, seed=0):
+    """Random 4/4 parts mixing straight, dotted, tied-over and triplet figures with rests"""
+    rng = np.random.default_rng(seed)
+    choices = np.array([0.25, 0.5, 0.5, 0.75, 1.0, 1.0, 1.5, 2.0])
+    rows = []
+    for part in range(n_parts):
+        onset = 0.0
+        triplet = 0
+        for _ in range(n_notes // n_parts):
+            if triplet == 0 and rng.random() < 0.05:
+                triplet = 3
+            if triplet:
+                length = 1 / 3
+                triplet -= 1
+            else:
+                length = float(rng.choice(choices))
+            midi = -1 if rng.random() < 0.1 else int(rng.integers(48, 84))
+            rows.append((onset, length, midi, 80 if midi >= 0 else -1, part, -1))
+            onset += length
+    notes = np.array(rows, dtype=module.NOTE_DTYPE)
+    notes = notes[np.argsort(notes['onset'], kind='stable')]
+    return module.NoteTable(
+        notes=notes,
+        chords=[],
+        time_signatures=[],
+        key_signatures=[],
+        tempo_markings=[],
+        duration=float((notes['onset'] + notes['duration']).max()),
+        time_signature=meter.TimeSignature('4/4')
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rhythmic analysis')
+    parser.add_argument('--notes', type=int, default=10000)
+    parser.add_argument('--parts', type=int, default=2)
+    args = parser.parse_args()
+
+    module = load_musical_analyzer()
+    analyzer = module.MusicalAnalyzer()
+    note_table = build_note_table(module, args.notes, args.parts)
+    events = note_table.events
+    levels = module.metrical_levels(note_table.time_signature)
+    print(f"Note table: {len(events)} events in {args.parts} parts, metrical levels {levels}")
+
+    start = time.perf_counter()
+    legacy_syncopation(events['duration'].tolist(), events['onset'].tolist())
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = analyzer.analyze_rhythmic_patterns(None, note_table)
+    new_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = reference_syncopation(module, events, levels)
+    reference_time = time.perf_counter() - start
+
+    print(f"Original off-grid onset loop:    {legacy_time:.3f}s (syncopation only)")
+    print(f"Per-note metrical-weight scan:   {reference_time:.3f}s (syncopation only)")
+    print(f"analyze_rhythmic_patterns:       {new_time:.3f}s (full rhythmic analysis)")
+    print(f"Speedup over the original loop:  {legacy_time / new_time:.1f}x")
+    print(f"Top pattern: {result['common_patterns'][0] if result['common_patterns'] else None}")
+
+    if not np.isclose(result['syncopation_score'], expected):
+        print(f"FAIL: syncopation {result['syncopation_score']:.6f}, per-note scan {expected:.6f}")
+        sys.exit(1)
+    print(f"Syncopation matches the per-note scan ({expected:.4f} per note)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the bulk WAV writer in music-generator.py
+Compares WavWriter against the original per-sample write_stereo_wav loop
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+def load_music_generator():
+    """Import server/music-generator.py despite the hyphenated filename"""
+    module_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'music-generator.py')
+    spec = importlib.util.spec_from_file_location('music_generator', module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def legacy_write_stereo_wav(output_path, audio_data, sample_rate):
+    """The original writer: two int.to_bytes writes per stereo frame"""
+    left_channel, right_channel = audio_data
+    duration_samples = len(left_channel)
+
+    with open(output_path, 'wb') as f:
+        f.write(b'RIFF')
+        f.write((36 + duration_samples * 4).to_bytes(4, 'little'))
+        f.write(b'WAVE')
+        f.write(b'fmt ')
+        f.write((16).to_bytes(4, 'little'))
+        f.write((1).to_bytes(2, 'little'))
+        f.write((2).to_bytes(2, 'little'))
+        f.write(sample_rate.to_bytes(4, 'little'))
+        f.write((sample_rate * 4).to_bytes(4, 'little'))
+        f.write((4).to_bytes(2, 'little'))
+        f.write((16).to_bytes(2, 'little'))
+        f.write(b'data')
+        f.write((duration_samples * 4).to_bytes(4, 'little'))
+
+        for i in range(duration_samples):
+            left_sample = int(32767 * max(-1, min(1, left_channel[i])))
+            right_sample = int(32767 * max(-1, min(1, right_channel[i])))
+            f.write(left_sample.to_bytes(2, 'little', signed=True))
+            f.write(right_sample.to_bytes(2, 'little', signed=True))
+
+def time_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark WAV writers')
+    parser.add_argument('--seconds', type=float, default=60, help='Audio length in seconds')
+    parser.add_argument('--sample_rate', type=int, default=44100, help='Sample rate')
+    args = parser.parse_args()
+
+    generator = load_music_generator()
+    num_samples = int(args.seconds * args.sample_rate)
+    rng = np.random.default_rng(0)
+    audio_data = (rng.uniform(-1.1, 1.1, num_samples), rng.uniform(-1.1, 1.1, num_samples))
+
+    print(f"🎧 Writing {args.seconds:g}s of stereo audio at {args.sample_rate} Hz")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy_path = os.path.join(tmp_dir, 'legacy.wav')
+        legacy_time = time_call(legacy_write_stereo_wav, legacy_path, audio_data, args.sample_rate)
+        print(f"legacy per-sample writer: {legacy_time:.3f}s")
+
+        for sample_format in generator.WAV_SAMPLE_FORMATS:
+            bulk_path = os.path.join(tmp_dir, f'{sample_format}.wav')
+            bulk_time = time_call(generator.write_stereo_wav, bulk_path, audio_data, args.sample_rate, sample_format)
+            print(f"WavWriter {sample_format:>8}: {bulk_time:.3f}s ({legacy_time / bulk_time:.0f}x)")
+
+        # Streaming mode in one-second blocks
+        stream_path = os.path.join(tmp_dir, 'stream.wav')
+        start = time.perf_counter()
+        with generator.WavWriter(stream_path, args.sample_rate) as writer:
+            for offset in range(0, num_samples, args.sample_rate):
+                writer.write_block(*(channel[offset:offset + args.sample_rate] for channel in audio_data))
+        stream_time = time.perf_counter() - start
+        print(f"WavWriter   stream: {stream_time:.3f}s ({legacy_time / stream_time:.0f}x)")
+
+        with open(legacy_path, 'rb') as f:
+            legacy_bytes = f.read()
+        for path in (os.path.join(tmp_dir, 'pcm16.wav'), stream_path):
+            with open(path, 'rb') as f:
+                if f.read() != legacy_bytes:
+                    print(f"❌ Output differs from legacy writer: {os.path.basename(path)}")
+                    sys.exit(1)
+        print("✅ 16-bit output is byte-identical to the legacy writer")
+
+if __name__ == "__main__":
+    main()
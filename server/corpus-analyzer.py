@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Batch corpus analysis for MIDI and MusicXML files
+Fans parsing and analysis out over a process pool in chunks and streams one
+record per file to JSONL or Parquet, combining MIDIAnalyzer (midi-analyzer.py)
+and MusicalAnalyzer (musical-analyzer.py)
+"""
+
+import argparse
+import glob
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+MIDI_EXTENSIONS = ('.mid', '.midi')
+SCORE_EXTENSIONS = MIDI_EXTENSIONS + ('.xml', '.musicxml', '.mxl')
+ANALYSES = ('harmony', 'rhythm', 'melody', 'structure')
+
+# Scalar columns of the Parquet output with their pyarrow types; the full
+# record is kept as JSON
+SUMMARY_COLUMNS = [
+    ('path', 'string', lambda r: r['path']),
+    ('ok', 'bool_', lambda r: r['ok']),
+    ('error', 'string', lambda r: r.get('error')),
+    ('seconds', 'float64', lambda r: r['seconds']),
+    ('midi_tempo', 'float64', lambda r: r['midi']['tempo']),
+    ('midi_key', 'string', lambda r: r['midi']['key']),
+    ('midi_time_signature', 'string', lambda r: r['midi']['time_signature']),
+    ('midi_track_count', 'int64', lambda r: r['midi']['track_count']),
+    ('midi_notes_count', 'int64', lambda r: r['midi']['notes_count']),
+    ('midi_duration', 'float64', lambda r: r['midi']['duration']),
+    ('detected_key', 'string', lambda r: r['analysis']['key_analysis']['detected_key']),
+    ('key_confidence', 'float64', lambda r: r['analysis']['key_analysis']['confidence']),
+    ('unique_chords', 'int64', lambda r: r['analysis']['harmony']['unique_chords']),
+    ('total_events', 'int64', lambda r: r['analysis']['rhythm']['total_events']),
+    ('rhythmic_density', 'float64', lambda r: r['analysis']['rhythm']['rhythmic_density']),
+    ('syncopation_score', 'float64', lambda r: r['analysis']['rhythm']['syncopation_score']),
+    ('total_notes', 'int64', lambda r: r['analysis']['melody']['total_notes']),
+    ('pitch_span', 'int64', lambda r: r['analysis']['melody']['pitch_range']['span']),
+    ('motif_count', 'int64', lambda r: len(r['analysis']['melody']['motif_analysis']))
+]
+
+def load_server_module(filename, name):
+    """Import a server script despite its hyphenated filename"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SERVER_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def find_scores(inputs):
+    """Expand files, directories (searched recursively) and glob patterns into score paths"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.extend(os.path.join(root, f) for f in files if f.lower().endswith(SCORE_EXTENSIONS))
+        elif os.path.isfile(item):
+            paths.append(item)
+        else:
+            paths.extend(p for p in glob.glob(item, recursive=True) if p.lower().endswith(SCORE_EXTENSIONS))
+    return sorted(set(paths))
+
+# Per-worker state, set up once by _init_worker
+_worker = {}
+
+def _init_worker(analyses):
+    """Import music21, mido and both analyzers once per worker process"""
+    from music21 import converter
+
+    musical_analyzer = load_server_module('musical-analyzer.py', 'musical_analyzer')
+    midi_analyzer = load_server_module('midi-analyzer.py', 'midi_analyzer')
+    # Failures are reported once, from the record, rather than also by MIDIAnalyzer
+    logging.getLogger('midi_analyzer').setLevel(logging.CRITICAL)
+    config = musical_analyzer.AnalysisConfig(**{f'analyze_{name}': name in analyses for name in ANALYSES})
+    _worker['parse'] = converter.parse
+    _worker['musical'] = musical_analyzer.MusicalAnalyzer(config)
+    _worker['midi'] = midi_analyzer.MIDIAnalyzer()
+
+def analyze_file(path):
+    """Analyze one score in a worker; failures become records with ok=False"""
+    start = time.perf_counter()
+    record = {'path': path, 'ok': True}
+    try:
+        if path.lower().endswith(MIDI_EXTENSIONS):
+            record['midi'] = _worker['midi'].analyze_midi(path)
+        record['analysis'] = _worker['musical'].analyze_composition(_worker['parse'](path))
+    except Exception as e:
+        record['ok'] = False
+        record['error'] = f"{type(e).__name__}: {e}"
+        record['details'] = traceback.format_exc()
+    record['seconds'] = time.perf_counter() - start
+    return record
+
+def _json_default(value):
+    """Serialize NumPy scalars and arrays left in analysis results"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+def summary_row(record):
+    """Flatten a record into SUMMARY_COLUMNS, with None for anything missing"""
+    row = {}
+    for column, _, getter in SUMMARY_COLUMNS:
+        try:
+            row[column] = getter(record)
+        except (KeyError, TypeError):
+            row[column] = None
+    row['record'] = json.dumps(record, default=_json_default)
+    return row
+
+class JsonlSink:
+    """One JSON record per line, flushed as each file finishes"""
+
+    def __init__(self, path):
+        self.file = sys.stdout if path == '-' else open(path, 'w')
+
+    def write(self, record):
+        self.file.write(json.dumps(record, default=_json_default) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+class ParquetSink:
+    """Summary columns plus the JSON record, written in row groups of batch_size files"""
+
+    def __init__(self, path, batch_size=256):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.batch_size = batch_size
+        self.rows = []
+        self.schema = pa.schema(
+            [(column, getattr(pa, type_name)()) for column, type_name, _ in SUMMARY_COLUMNS]
+            + [('record', pa.string())]
+        )
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, record):
+        self.rows.append(summary_row(record))
+        if len(self.rows) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self.rows:
+            self.writer.write_table(self.pa.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+def analyze_corpus(paths, sink, analyses=ANALYSES[:3], workers=None, chunksize=None):
+    """Analyze paths on a process pool, writing records to sink as they complete
+
+    Files are handed out in chunks of chunksize to keep pool overhead low on
+    large corpora; by default about four chunks per worker, at most 32 files
+    each. Returns (files analyzed, files failed).
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, min(32, len(paths) // (workers * 4)))
+
+    done = failed = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(analyses,)) as pool:
+        for record in pool.imap_unordered(analyze_file, paths, chunksize=chunksize):
+            sink.write(record)
+            done += 1
+            if not record['ok']:
+                failed += 1
+                logger.warning(f"Failed {record['path']}: {record['error']}")
+            if done % 100 == 0:
+                elapsed = time.perf_counter() - start
+                logger.info(f"{done}/{len(paths)} files, {done / elapsed * 3600:.0f} files/hour")
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Analyzed {done} files ({failed} failed) in {elapsed:.1f}s, "
+                f"{done / elapsed * 3600 if elapsed > 0 else 0:.0f} files/hour")
+    return done, failed
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch analysis of MIDI and MusicXML corpora')
+    parser.add_argument('inputs', nargs='+', help='Score files, directories or glob patterns')
+    parser.add_argument('--output', default='-', help='Output path, - for JSONL on stdout')
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], help='Output format (default from --output extension)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunksize', type=int, help='Files per work chunk (default: automatic)')
+    parser.add_argument('--analyses', default='harmony,rhythm,melody',
+                        help=f"Comma-separated MusicalAnalyzer analyses from {', '.join(ANALYSES)}")
+    args = parser.parse_args()
+
+    analyses = tuple(a.strip() for a in args.analyses.split(',') if a.strip())
+    unknown = set(analyses) - set(ANALYSES)
+    if unknown:
+        parser.error(f"unknown analyses: {', '.join(sorted(unknown))}")
+    output_format = args.format or ('parquet' if args.output.endswith('.parquet') else 'jsonl')
+    if output_format == 'parquet' and args.output == '-':
+        parser.error('Parquet output needs an --output path')
+
+    paths = find_scores(args.inputs)
+    if not paths:
+        logger.error("No MIDI or MusicXML files found")
+        sys.exit(1)
+    logger.info(f"Found {len(paths)} scores")
+
+    try:
+        sink = ParquetSink(args.output) if output_format == 'parquet' else JsonlSink(args.output)
+    except RuntimeError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    try:
+        analyze_corpus(paths, sink, analyses, args.workers, args.chunksize)
+    finally:
+        sink.close()
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,12 @@ import os
 import logging
 import tempfile
 import shutil
+import threading
+import time
+import copy
+import hashlib
+import sqlite3
+from collections import OrderedDict
 from music21 import stream, note, chord, meter, tempo, key, duration, pitch, scale, interval, bar
 from music21 import converter, corpus, analysis, features
 from music21.midi import MidiFile
@@ -42,8 +48,224 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Seconds a loaded model may sit unused before the registry drops it
+MODEL_IDLE_TIMEOUT = int(os.environ.get('MODEL_IDLE_TIMEOUT', 600))
+
+class ModelRegistry:
+    """Process-wide cache of loaded AI models
+
+    Models are loaded lazily on first use (or up front via warm_up), shared
+    by every EnhancedMusicGenerator in the process, and dropped again once
+    they have been idle for longer than idle_timeout seconds. Load and
+    inference times are tracked per model so they can be compared.
+    """
+
+    def __init__(self, idle_timeout=MODEL_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._loaders = {}
+        self._models = {}
+        self._last_used = {}
+        self._metrics = {}
+        self._lock = threading.RLock()
+        self._sweeper = None
+
+    def register(self, name, loader):
+        """Register a zero-argument loader for a model name"""
+        with self._lock:
+            self._loaders[name] = loader
+            self._metrics.setdefault(name, {
+                'loads': 0,
+                'load_seconds': 0.0,
+                'inference_calls': 0,
+                'inference_seconds': 0.0,
+                'evictions': 0
+            })
+
+    def get(self, name):
+        """Return the loaded model, loading it on first use"""
+        with self._lock:
+            if name not in self._models:
+                started = time.perf_counter()
+                self._models[name] = self._loaders[name]()
+                elapsed = time.perf_counter() - started
+                self._metrics[name]['loads'] += 1
+                self._metrics[name]['load_seconds'] += elapsed
+                logger.info(f"Loaded model '{name}' in {elapsed:.2f}s")
+                self._start_sweeper()
+            self._last_used[name] = time.monotonic()
+            return self._models[name]
+
+    def warm_up(self, names=None):
+        """Load the given models (default: all registered) ahead of the first request"""
+        for name in names or list(self._loaders):
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.warning(f"⚠️  Could not warm up model '{name}': {e}")
+
+    def record_inference(self, name, seconds):
+        with self._lock:
+            self._metrics[name]['inference_calls'] += 1
+            self._metrics[name]['inference_seconds'] += seconds
+
+    def evict_idle(self):
+        """Drop models that have not been used within idle_timeout"""
+        now = time.monotonic()
+        with self._lock:
+            for name in [n for n, used in self._last_used.items() if now - used > self.idle_timeout]:
+                self._models.pop(name, None)
+                self._last_used.pop(name, None)
+                self._metrics[name]['evictions'] += 1
+                logger.info(f"Evicted idle model '{name}'")
+
+    def _start_sweeper(self):
+        if self.idle_timeout <= 0 or (self._sweeper and self._sweeper.is_alive()):
+            return
+        self._sweeper = threading.Thread(target=self._sweep, daemon=True)
+        self._sweeper.start()
+
+    def _sweep(self):
+        while True:
+            time.sleep(max(1, self.idle_timeout / 2))
+            self.evict_idle()
+            with self._lock:
+                if not self._models:
+                    self._sweeper = None
+                    return
+
+    def stats(self):
+        """Per-model load versus inference timing"""
+        with self._lock:
+            return {
+                name: {**metrics, 'loaded': name in self._models}
+                for name, metrics in self._metrics.items()
+            }
+
+def load_text_generation_pipeline():
+    """Build the GPT-2 text-generation pipeline used for lyrics analysis"""
+    return pipeline(
+        "text-generation",
+        model="gpt2",  # Fallback to stable model
+        device=0 if torch.cuda.is_available() else -1,
+        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32
+    )
+
+MODEL_REGISTRY = ModelRegistry()
+if AI_AVAILABLE:
+    MODEL_REGISTRY.register('music_generator', load_text_generation_pipeline)
+
+def warm_up():
+    """Load all AI models now so the first composition does not pay for it"""
+    MODEL_REGISTRY.warm_up()
+
+# Bump when analyze_lyrics_with_ai / analyze_lyrics_traditional change their output
+LYRIC_ANALYZER_VERSION = 1
+LYRIC_CACHE_SIZE = int(os.environ.get('LYRIC_CACHE_SIZE', 256))
+LYRIC_CACHE_PATH = os.environ.get(
+    'LYRIC_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'burnt_beats_lyric_analysis.sqlite3')
+)
+
+class LyricAnalysisCache:
+    """Content-addressed cache for lyric analysis results
+
+    Entries are keyed by a SHA-256 of the lyrics plus the analyzer name and
+    LYRIC_ANALYZER_VERSION. Lookups go through an in-memory LRU first and
+    then an optional SQLite file shared by every process on the host.
+    """
+
+    def __init__(self, max_entries=LYRIC_CACHE_SIZE, db_path=LYRIC_CACHE_PATH):
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db = None
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+                self._db.execute('PRAGMA journal_mode=WAL')
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS lyric_analysis (cache_key TEXT PRIMARY KEY, analysis TEXT NOT NULL)'
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️  Lyric analysis disk cache disabled: {e}")
+                self._db = None
+
+    @staticmethod
+    def cache_key(lyrics, analyzer):
+        digest = hashlib.sha256(lyrics.encode('utf-8')).hexdigest()
+        return f"{analyzer}-v{LYRIC_ANALYZER_VERSION}:{digest}"
+
+    def get(self, lyrics, analyzer):
+        """Return a copy of the cached analysis, or None on a miss"""
+        key = self.cache_key(lyrics, analyzer)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return copy.deepcopy(self._memory[key])
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT analysis FROM lyric_analysis WHERE cache_key = ?', (key,)
+                ).fetchone()
+                if row:
+                    analysis_result = json.loads(row[0])
+                    self._remember(key, analysis_result)
+                    self.disk_hits += 1
+                    return copy.deepcopy(analysis_result)
+
+            self.misses += 1
+            return None
+
+    def put(self, lyrics, analyzer, analysis_result):
+        key = self.cache_key(lyrics, analyzer)
+        with self._lock:
+            self._remember(key, copy.deepcopy(analysis_result))
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO lyric_analysis (cache_key, analysis) VALUES (?, ?)',
+                        (key, json.dumps(analysis_result))
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️  Could not persist lyric analysis: {e}")
+
+    def get_or_compute(self, lyrics, analyzer, compute):
+        cached = self.get(lyrics, analyzer)
+        if cached is not None:
+            return cached
+        analysis_result = compute()
+        self.put(lyrics, analyzer, analysis_result)
+        return analysis_result
+
+    def _remember(self, key, analysis_result):
+        self._memory[key] = analysis_result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        """Hit and miss counters for sizing the cache"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory)
+            }
+
+LYRIC_ANALYSIS_CACHE = LyricAnalysisCache()
+
 class EnhancedMusicGenerator:
-    def __init__(self):
+    def __init__(self, registry=MODEL_REGISTRY, analysis_cache=LYRIC_ANALYSIS_CACHE):
+        self.registry = registry
+        self.analysis_cache = analysis_cache
         self.ai_models = {}
         self.load_ai_models()
 
@@ -53,18 +275,8 @@ class EnhancedMusicGenerator:
             return
 
         try:
-            # Load music-specific transformer model
-            logger.info("Loading advanced AI models...")
-
-            # Music generation model
-            self.ai_models['music_generator'] = pipeline(
-                "text-generation",
-                model="gpt2",  # Fallback to stable model
-                device=0 if torch.cuda.is_available() else -1,
-                torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32
-            )
-
-            logger.info("✅ Advanced AI models loaded successfully")
+            # Music generation model, shared across the whole process
+            self.ai_models['music_generator'] = self.registry.get('music_generator')
 
         except Exception as e:
             logger.warning(f"⚠️  Could not load advanced AI models: {e}")
@@ -75,10 +287,15 @@ class EnhancedMusicGenerator:
         if not AI_AVAILABLE or not self.ai_models:
             return self.analyze_lyrics_traditional(lyrics)
 
+        cached = self.analysis_cache.get(lyrics, 'ai')
+        if cached is not None:
+            return cached
+
         try:
             # AI-enhanced emotional analysis
             prompt = f"Analyze the emotional content and musical implications of these lyrics: {lyrics[:200]}..."
 
+            started = time.perf_counter()
             result = self.ai_models['music_generator'](
                 prompt,
                 max_new_tokens=150,
@@ -88,11 +305,13 @@ class EnhancedMusicGenerator:
                 top_p=0.95,
                 pad_token_id=self.ai_models['music_generator'].tokenizer.eos_token_id
             )
+            self.registry.record_inference('music_generator', time.perf_counter() - started)
 
             ai_analysis = result[0]['generated_text'].replace(prompt, "").strip()
 
             # Parse AI analysis into structured data
             analysis = self.parse_ai_analysis(ai_analysis, lyrics)
+            self.analysis_cache.put(lyrics, 'ai', analysis)
             logger.info("✅ AI lyrics analysis completed")
             return analysis
 
@@ -301,6 +520,12 @@ class EnhancedMusicGenerator:
 
     def analyze_lyrics_traditional(self, lyrics):
         """Traditional lyrics analysis as fallback"""
+        return self.analysis_cache.get_or_compute(
+            lyrics, 'traditional', lambda: self.compute_traditional_analysis(lyrics)
+        )
+
+    def compute_traditional_analysis(self, lyrics):
+        """Rule-based lyrics analysis, uncached"""
         lines = [line.strip() for line in lyrics.split('\n') if line.strip()]
 
         emotion_weights = {
@@ -570,6 +795,70 @@ def generate_ai_bass_pattern(root_note, genre, emotion):
 
     return bass_notes
 
+def seed_generation(seed):
+    """Seed every RNG the composition path draws from"""
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+    if AI_AVAILABLE:
+        torch.manual_seed(seed)
+
+def render_composition(title, lyrics, genre, tempo_bpm, key_sig, duration_seconds, output_path,
+                       output_format="midi", ai_enhanced=False, seed=None):
+    """Compose a score and write it (plus metadata) to output_path; returns the metadata
+
+    Passing a seed makes the composition reproducible for identical inputs.
+    """
+    if seed is not None:
+        seed_generation(seed)
+
+    print(f"🎵 Generating enhanced AI composition: {title}")
+    print(f"🤖 AI Enhancement: {'Enabled' if ai_enhanced and AI_AVAILABLE else 'Rule-based'}")
+    print(f"Genre: {genre}, Tempo: {tempo_bpm} BPM, Duration: {duration_seconds}s")
+
+    # Create the enhanced composition
+    score = create_enhanced_composition(
+        title, lyrics, genre, tempo_bpm, key_sig, duration_seconds
+    )
+
+    # Write output
+    if output_format == "both":
+        score.write('midi', fp=output_path)
+        xml_path = output_path.replace('.mid', '.musicxml')
+        score.write('musicxml', fp=xml_path)
+        print(f"✅ Generated MIDI: {output_path}")
+        print(f"✅ Generated MusicXML: {xml_path}")
+    else:
+        score.write(output_format, fp=output_path)
+        print(f"✅ Enhanced composition saved: {output_path}")
+
+    # Generate comprehensive metadata
+    metadata = {
+        "title": title,
+        "genre": genre,
+        "tempo": tempo_bpm,
+        "key": key_sig,
+        "duration": duration_seconds,
+        "ai_enhanced": ai_enhanced and AI_AVAILABLE,
+        "seed": seed,
+        "generation_method": "enhanced_ai_music21",
+        "features": {
+            "ai_lyrics_analysis": AI_AVAILABLE,
+            "enhanced_harmony": True,
+            "dynamic_melody": True,
+            "multi_part_composition": True,
+            "emotional_mapping": True
+        },
+        "model_timing": MODEL_REGISTRY.stats(),
+        "lyric_cache": LYRIC_ANALYSIS_CACHE.stats()
+    }
+
+    metadata_path = output_path.replace('.mid', '_enhanced_metadata.json')
+    with open(metadata_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    print("🎉 Enhanced composition completed successfully")
+    return metadata
+
 def main():
     if len(sys.argv) < 8:
         print("Usage: python enhanced-music21-generator.py <title> <lyrics> <genre> <tempo> <key> <duration> <output_path> [--ai-enhanced] [--format=midi|musicxml|both]")
@@ -592,53 +881,14 @@ def main():
             if arg.startswith("--format="):
                 output_format = arg.split("=", 1)[1]
 
-        print(f"🎵 Generating enhanced AI composition: {title}")
-        print(f"🤖 AI Enhancement: {'Enabled' if ai_enhanced and AI_AVAILABLE else 'Rule-based'}")
-        print(f"Genre: {genre}, Tempo: {tempo_bpm} BPM, Duration: {duration_seconds}s")
-
-        # Create the enhanced composition
-        score = create_enhanced_composition(
-            title, lyrics, genre, tempo_bpm, key_sig, duration_seconds
+        render_composition(
+            title, lyrics, genre, tempo_bpm, key_sig, duration_seconds, output_path,
+            output_format=output_format, ai_enhanced=ai_enhanced
         )
 
-        # Write output
-        if output_format == "both":
-            score.write('midi', fp=output_path)
-            xml_path = output_path.replace('.mid', '.musicxml')
-            score.write('musicxml', fp=xml_path)
-            print(f"✅ Generated MIDI: {output_path}")
-            print(f"✅ Generated MusicXML: {xml_path}")
-        else:
-            score.write(output_format, fp=output_path)
-            print(f"✅ Enhanced composition saved: {output_path}")
-
-        # Generate comprehensive metadata
-        metadata = {
-            "title": title,
-            "genre": genre,
-            "tempo": tempo_bpm,
-            "key": key_sig,
-            "duration": duration_seconds,
-            "ai_enhanced": ai_enhanced and AI_AVAILABLE,
-            "generation_method": "enhanced_ai_music21",
-            "features": {
-                "ai_lyrics_analysis": AI_AVAILABLE,
-                "enhanced_harmony": True,
-                "dynamic_melody": True,
-                "multi_part_composition": True,
-                "emotional_mapping": True
-            }
-        }
-
-        metadata_path = output_path.replace('.mid', '_enhanced_metadata.json')
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
-
-        print("🎉 Enhanced composition completed successfully")
-
     except Exception as e:
         print(f"❌ Error generating enhanced music: {e}", file=sys.stderr)
         sys.exit(1)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
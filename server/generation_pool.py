@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Persistent worker pool for the enhanced music21 generator
+Keeps music21 and the AI models resident in warm worker processes so a
+generation request only pays for composition, not interpreter startup
+"""
+
+import contextlib
+import importlib.util
+import io
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import traceback
+
+logger = logging.getLogger(__name__)
+
+GENERATOR_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'enhanced-music21-generator.py')
+
+class GenerationTimeout(Exception):
+    """Raised when a worker does not finish a job within the job timeout"""
+
+class GenerationError(Exception):
+    """Raised when the generator fails inside a worker"""
+
+    def __init__(self, message, details=''):
+        super().__init__(message)
+        self.details = details
+
+def load_generator_module():
+    """Import enhanced-music21-generator.py despite the hyphenated filename"""
+    spec = importlib.util.spec_from_file_location('enhanced_music21_generator', GENERATOR_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _worker_main(conn):
+    """Worker loop: import the generator once, then serve jobs until told to stop"""
+    generator = load_generator_module()
+    warm_up = getattr(generator, 'warm_up', None)
+    if warm_up:
+        warm_up()
+    conn.send({'ready': True})
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        log = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(log):
+                metadata = generator.render_composition(**job)
+            conn.send({'ok': True, 'metadata': metadata, 'log': log.getvalue()})
+        except Exception as e:
+            conn.send({
+                'ok': False,
+                'error': str(e),
+                'details': traceback.format_exc(),
+                'log': log.getvalue()
+            })
+
+    conn.close()
+
+class _Worker:
+    """Handle on one warm generator process"""
+
+    def __init__(self, mp_context):
+        self.conn, child_conn = mp_context.Pipe()
+        self.process = mp_context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs_done = 0
+        self.ready = False
+
+    def wait_ready(self, timeout):
+        """Block until the worker has imported the generator"""
+        if not self.ready and self.conn.poll(timeout):
+            self.ready = self.conn.recv().get('ready', False)
+        return self.ready
+
+    def stop(self, timeout=5):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+class GenerationWorkerPool:
+    """Fixed-size pool of warm generator workers fed from a local idle queue
+
+    Each request checks out an idle worker, sends it a job over a pipe and
+    waits up to job_timeout for the result. Workers that time out or die
+    are killed and replaced; workers are recycled after max_jobs_per_worker
+    jobs to cap memory growth from music21 and the models.
+    """
+
+    def __init__(self, size=2, job_timeout=60, max_jobs_per_worker=50, startup_timeout=120):
+        self.size = size
+        self.job_timeout = job_timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.startup_timeout = startup_timeout
+        # Fork workers from a clean single-threaded server process rather than
+        # from the threaded web server that is calling into the pool
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self._mp_context = multiprocessing.get_context(start_method)
+        self._idle = queue.Queue()
+        self._workers = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self):
+        """Launch all workers and wait for them to finish warming up"""
+        workers = [self._spawn() for _ in range(self.size)]
+        for worker in workers:
+            if not worker.wait_ready(self.startup_timeout):
+                logger.warning("⚠️ Generator worker did not warm up within %ss", self.startup_timeout)
+            self._idle.put(worker)
+        logger.info("✅ Generation pool ready with %d workers", self.size)
+        return self
+
+    def _spawn(self):
+        worker = _Worker(self._mp_context)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _retire(self, worker, kill=False):
+        with self._lock:
+            self._workers.discard(worker)
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+
+    def _replace(self, worker, kill=False):
+        """Retire a worker and put a fresh one in its place"""
+        self._retire(worker, kill=kill)
+        if not self._closed:
+            self._idle.put(self._spawn())
+
+    def submit(self, job, timeout=None):
+        """Run one generation job and return the worker's result dict
+
+        job holds keyword arguments for render_composition.
+        """
+        if self._closed:
+            raise RuntimeError("Generation pool is shut down")
+
+        timeout = self.job_timeout if timeout is None else timeout
+        worker = self._idle.get()
+
+        try:
+            # A freshly recycled worker may still be importing the generator
+            if not worker.wait_ready(self.startup_timeout):
+                self._replace(worker, kill=True)
+                raise GenerationError('Generator worker failed to start')
+            worker.conn.send(job)
+            if not worker.conn.poll(timeout):
+                self._replace(worker, kill=True)
+                raise GenerationTimeout(f"Generation exceeded {timeout}s")
+            result = worker.conn.recv()
+        except (EOFError, BrokenPipeError, OSError) as e:
+            self._replace(worker, kill=True)
+            raise GenerationError('Generator worker died', str(e))
+
+        worker.jobs_done += 1
+        if worker.jobs_done >= self.max_jobs_per_worker:
+            self._replace(worker)
+        else:
+            self._idle.put(worker)
+
+        if not result.get('ok'):
+            raise GenerationError(result.get('error', 'Unknown error during generation'), result.get('details', ''))
+        return result
+
+    def shutdown(self):
+        """Stop every worker"""
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+        for worker in workers:
+            self._retire(worker)
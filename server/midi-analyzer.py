@@ -9,6 +9,7 @@ import sys
 import os
 import argparse
 import json
+import mmap
 import mido
 from pathlib import Path
 import logging
@@ -17,66 +18,195 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Key signature meta events by (sharps, or negative flats, and minor flag),
+# named the way mido reports them
+KEY_SIGNATURES = {
+    **{(sf, 0): name for sf, name in zip(range(-7, 8), [
+        'Cb', 'Gb', 'Db', 'Ab', 'Eb', 'Bb', 'F', 'C', 'G', 'D', 'A', 'E', 'B', 'F#', 'C#'
+    ])},
+    **{(sf, 1): name + 'm' for sf, name in zip(range(-7, 8), [
+        'Ab', 'Eb', 'Bb', 'F', 'C', 'G', 'D', 'A', 'E', 'B', 'F#', 'C#', 'G#', 'D#', 'A#'
+    ])}
+}
+
+# Data bytes after system common and real-time status bytes
+SYSTEM_DATA_LENGTHS = {0xF1: 1, 0xF2: 2, 0xF3: 1, 0xF6: 0, 0xF8: 0, 0xF9: 0, 0xFA: 0,
+                       0xFB: 0, 0xFC: 0, 0xFD: 0, 0xFE: 0}
+
+class MidiScanError(ValueError):
+    """Raised when scan_midi meets anything it does not handle; use mido instead"""
+
+def _read_variable_int(data, pos):
+    byte = data[pos]
+    value = byte & 0x7F
+    pos += 1
+    while byte & 0x80:
+        byte = data[pos]
+        value = (value << 7) | (byte & 0x7F)
+        pos += 1
+    return value, pos
+
+def _scan_track(data, pos, end, summary, tempo_changes):
+    """Walk one MTrk chunk, decoding only tempo, key, time signature and note-ons"""
+    tick = 0
+    status = 0
+    notes_count = 0
+    while pos < end:
+        delta, pos = _read_variable_int(data, pos)
+        tick += delta
+
+        byte = data[pos]
+        if byte & 0x80:
+            pos += 1
+            # Meta events don't set running status
+            if byte != 0xFF:
+                status = byte
+        elif status and status < 0xF0:
+            byte = status
+        else:
+            raise MidiScanError('running status without a channel status')
+
+        if byte < 0xF0:
+            kind = byte & 0xF0
+            if kind == 0x90:
+                if data[pos + 1]:
+                    notes_count += 1
+                pos += 2
+            elif kind == 0xC0 or kind == 0xD0:
+                pos += 1
+            else:
+                pos += 2
+        elif byte == 0xFF:
+            meta_type = data[pos]
+            length, pos = _read_variable_int(data, pos + 1)
+            if meta_type == 0x51:
+                if length < 3:
+                    raise MidiScanError('short set_tempo event')
+                tempo = (data[pos] << 16) | (data[pos + 1] << 8) | data[pos + 2]
+                summary['tempo'] = tempo
+                tempo_changes.append((tick, tempo))
+            elif meta_type == 0x59:
+                if length < 2:
+                    raise MidiScanError('short key_signature event')
+                sharps = data[pos] - 256 if data[pos] > 127 else data[pos]
+                if (sharps, data[pos + 1]) not in KEY_SIGNATURES:
+                    raise MidiScanError('invalid key signature')
+                summary['key'] = KEY_SIGNATURES[(sharps, data[pos + 1])]
+            elif meta_type == 0x58:
+                if length < 4:
+                    raise MidiScanError('short time_signature event')
+                summary['time_signature'] = (data[pos], 2 ** data[pos + 1])
+            pos += length
+        elif byte == 0xF0 or byte == 0xF7:
+            length, pos = _read_variable_int(data, pos)
+            pos += length
+        elif byte in SYSTEM_DATA_LENGTHS:
+            pos += SYSTEM_DATA_LENGTHS[byte]
+        else:
+            raise MidiScanError(f'undefined status byte 0x{byte:02x}')
+
+    if pos != end:
+        raise MidiScanError('event runs past the end of its track chunk')
+    summary['notes_count'] += notes_count
+    summary['total_ticks'] = max(summary['total_ticks'], tick)
+
+def scan_midi(midi_path):
+    """Read what analyze_midi reports straight from the SMF chunks
+
+    The file is memory-mapped and walked event by event without building
+    message objects: payloads of events that are not needed are skipped by
+    their length and note-ons are counted from their velocity byte. Returns
+    the same summary as MIDIAnalyzer.read_with_mido. Raises MidiScanError
+    for anything mido may read differently (SMPTE timing, type 2 files,
+    malformed chunks).
+    """
+    with open(midi_path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            raise MidiScanError(str(e))
+
+    with data:
+        try:
+            if data[:4] != b'MThd':
+                raise MidiScanError('MThd not found')
+            header_size = int.from_bytes(data[4:8], 'big')
+            midi_type = int.from_bytes(data[8:10], 'big', signed=True)
+            track_count = int.from_bytes(data[10:12], 'big', signed=True)
+            ticks_per_beat = int.from_bytes(data[12:14], 'big', signed=True)
+            if header_size < 6 or len(data) < 14:
+                raise MidiScanError('short MThd chunk')
+            if midi_type == 2 or ticks_per_beat <= 0:
+                raise MidiScanError('type 2 file or SMPTE time division')
+
+            summary = {
+                'ticks_per_beat': ticks_per_beat,
+                'track_count': track_count,
+                'tempo': None,
+                'key': None,
+                'time_signature': None,
+                'total_ticks': 0,
+                'notes_count': 0
+            }
+            tempo_changes = []
+            pos = 8 + header_size
+            for _ in range(track_count):
+                if data[pos:pos + 4] != b'MTrk':
+                    raise MidiScanError('no MTrk header at start of track')
+                end = pos + 8 + int.from_bytes(data[pos + 4:pos + 8], 'big')
+                if end > len(data):
+                    raise MidiScanError('track chunk runs past the end of the file')
+                _scan_track(data, pos + 8, end, summary, tempo_changes)
+                pos = end
+        except IndexError:
+            raise MidiScanError('truncated event')
+
+    # Playback time over the merged tempo map, as mido's MidiFile.length
+    seconds = 0.0
+    last_tick = 0
+    tempo = 500000
+    for tick, new_tempo in sorted(tempo_changes, key=lambda change: change[0]):
+        seconds += mido.tick2second(tick - last_tick, ticks_per_beat, tempo)
+        last_tick = tick
+        tempo = new_tempo
+    summary['length'] = seconds + mido.tick2second(summary['total_ticks'] - last_tick, ticks_per_beat, tempo)
+    return summary
+
 class MIDIAnalyzer:
     def __init__(self):
-        self.key_signatures = {
-            -7: 'Cb', -6: 'Gb', -5: 'Db', -4: 'Ab', -3: 'Eb', -2: 'Bb', -1: 'F',
-            0: 'C', 1: 'G', 2: 'D', 3: 'A', 4: 'E', 5: 'B', 6: 'F#', 7: 'C#'
-        }
+        self.key_signatures = KEY_SIGNATURES
     
     def analyze_midi(self, midi_path):
         """Analyze a MIDI file and extract musical information"""
         try:
-            mid = mido.MidiFile(midi_path)
+            try:
+                summary = scan_midi(midi_path)
+            except MidiScanError as e:
+                logger.debug(f"Raw MIDI scan failed ({e}), reading with mido")
+                summary = self.read_with_mido(midi_path)
             
             # Initialize analysis results
             analysis = {
                 'title': os.path.basename(midi_path).replace('.mid', ''),
-                'duration': 0,
+                'duration': summary['length'],
                 'tempo': 120,  # Default tempo
                 'key': 'C',    # Default key
-                'track_count': len(mid.tracks),
+                'track_count': summary['track_count'],
                 'time_signature': '4/4',
-                'total_ticks': 0,
-                'notes_count': 0
+                'total_ticks': summary['total_ticks'],
+                'notes_count': summary['notes_count']
             }
-            
-            # Calculate duration in seconds
-            analysis['duration'] = mid.length
-            
-            # Analyze each track
-            for i, track in enumerate(mid.tracks):
-                current_time = 0
-                
-                for msg in track:
-                    current_time += msg.time
-                    
-                    # Extract tempo
-                    if msg.type == 'set_tempo':
-                        analysis['tempo'] = mido.tempo2bpm(msg.tempo)
-                    
-                    # Extract key signature
-                    elif msg.type == 'key_signature':
-                        key_num = msg.key
-                        if key_num in self.key_signatures:
-                            analysis['key'] = self.key_signatures[key_num]
-                            if msg.mode == 1:  # Minor mode
-                                analysis['key'] += 'm'
-                    
-                    # Extract time signature
-                    elif msg.type == 'time_signature':
-                        analysis['time_signature'] = f"{msg.numerator}/{msg.denominator}"
-                    
-                    # Count notes
-                    elif msg.type == 'note_on' and msg.velocity > 0:
-                        analysis['notes_count'] += 1
-                
-                analysis['total_ticks'] = max(analysis['total_ticks'], current_time)
+            if summary['tempo'] is not None:
+                analysis['tempo'] = mido.tempo2bpm(summary['tempo'])
+            if summary['key'] is not None:
+                analysis['key'] = summary['key']
+            if summary['time_signature'] is not None:
+                analysis['time_signature'] = "%d/%d" % summary['time_signature']
             
             # Estimate duration if not available
             if analysis['duration'] == 0 and analysis['total_ticks'] > 0:
                 # Use ticks per beat and tempo to estimate duration
-                ticks_per_beat = mid.ticks_per_beat
+                ticks_per_beat = summary['ticks_per_beat']
                 beats_per_minute = analysis['tempo']
                 analysis['duration'] = (analysis['total_ticks'] / ticks_per_beat) * (60 / beats_per_minute)
             
@@ -85,6 +215,41 @@ class MIDIAnalyzer:
         except Exception as e:
             logger.error(f"Error analyzing MIDI file: {e}")
             raise
+    
+    def read_with_mido(self, midi_path):
+        """Parse the file with mido and summarize it for analyze_midi"""
+        mid = mido.MidiFile(midi_path)
+        summary = {
+            'ticks_per_beat': mid.ticks_per_beat,
+            'track_count': len(mid.tracks),
+            'tempo': None,
+            'key': None,
+            'time_signature': None,
+            'total_ticks': 0,
+            'notes_count': 0,
+            # Playback time in seconds
+            'length': mid.length
+        }
+        
+        # Analyze each track
+        for track in mid.tracks:
+            current_time = 0
+            
+            for msg in track:
+                current_time += msg.time
+                
+                if msg.type == 'set_tempo':
+                    summary['tempo'] = msg.tempo
+                elif msg.type == 'key_signature':
+                    summary['key'] = msg.key
+                elif msg.type == 'time_signature':
+                    summary['time_signature'] = (msg.numerator, msg.denominator)
+                elif msg.type == 'note_on' and msg.velocity > 0:
+                    summary['notes_count'] += 1
+            
+            summary['total_ticks'] = max(summary['total_ticks'], current_time)
+        
+        return summary
 
 def main():
     parser = argparse.ArgumentParser(description='MIDI File Analyzer for RVC Pipeline')
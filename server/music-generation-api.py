@@ -5,18 +5,24 @@ Flask API wrapper for enhanced music generation
 Accepts lyrics + style parameters and returns MIDI + metadata
 """
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 import tempfile
 import os
 import json
 import sys
-import subprocess
 import traceback
 from pathlib import Path
 import uuid
+import atexit
+import hashlib
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 
+from generation_pool import GenerationWorkerPool, GenerationTimeout, GenerationError
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for cross-origin requests
 
@@ -25,6 +31,34 @@ UPLOAD_FOLDER = 'uploads'
 TEMP_FOLDER = tempfile.gettempdir()
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Generator worker pool
+GENERATION_WORKERS = int(os.environ.get('GENERATION_WORKERS', 2))
+GENERATION_JOB_TIMEOUT = int(os.environ.get('GENERATION_JOB_TIMEOUT', 60))
+GENERATION_MAX_JOBS_PER_WORKER = int(os.environ.get('GENERATION_MAX_JOBS_PER_WORKER', 50))
+BATCH_MAX_SONGS = int(os.environ.get('BATCH_MAX_SONGS', 1000))
+
+# Content-addressed store for deterministic renders
+RENDER_CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, 'render-cache')
+RENDER_CACHE_VERSION = 1
+RENDER_ARTIFACT_SUFFIXES = ['.mid', '.musicxml', '_enhanced_metadata.json']
+os.makedirs(RENDER_CACHE_FOLDER, exist_ok=True)
+
+_generation_pool = None
+_generation_pool_lock = threading.Lock()
+
+def get_generation_pool():
+    """Start the warm generator workers on first use and reuse them afterwards"""
+    global _generation_pool
+    with _generation_pool_lock:
+        if _generation_pool is None:
+            _generation_pool = GenerationWorkerPool(
+                size=GENERATION_WORKERS,
+                job_timeout=GENERATION_JOB_TIMEOUT,
+                max_jobs_per_worker=GENERATION_MAX_JOBS_PER_WORKER
+            ).start()
+            atexit.register(_generation_pool.shutdown)
+        return _generation_pool
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -34,6 +68,210 @@ def health_check():
         'timestamp': datetime.now().isoformat()
     })
 
+def render_cache_key(title, lyrics, genre, tempo, key_sig, duration, style_options):
+    """Canonical hash of every parameter that shapes a rendered composition"""
+    canonical = json.dumps({
+        'version': RENDER_CACHE_VERSION,
+        'title': title,
+        'lyrics': lyrics,
+        'genre': genre,
+        'tempo': tempo,
+        'key': key_sig,
+        'duration': duration,
+        'style_options': style_options
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def link_artifacts(src_base, dst_base):
+    """Hard-link every render artifact at src_base to dst_base, copying across filesystems"""
+    for suffix in RENDER_ARTIFACT_SUFFIXES:
+        src = src_base + suffix
+        if not os.path.exists(src):
+            continue
+        try:
+            os.link(src, dst_base + suffix)
+        except OSError:
+            shutil.copy2(src, dst_base + suffix)
+
+def restore_render(render_key, base_path):
+    """Link a cached render into place; returns False on a cache miss"""
+    entry_base = os.path.join(RENDER_CACHE_FOLDER, render_key, 'render')
+    if not os.path.exists(entry_base + '.mid'):
+        return False
+    link_artifacts(entry_base, base_path)
+    return True
+
+def store_render(render_key, base_path):
+    """Publish freshly generated artifacts into the content-addressed store"""
+    entry_dir = os.path.join(RENDER_CACHE_FOLDER, render_key)
+    if os.path.exists(entry_dir):
+        return
+
+    # Stage in a private directory and rename so readers never see a partial entry
+    staging_dir = os.path.join(RENDER_CACHE_FOLDER, f'.staging-{uuid.uuid4().hex}')
+    os.makedirs(staging_dir)
+    try:
+        link_artifacts(base_path, os.path.join(staging_dir, 'render'))
+        os.rename(staging_dir, entry_dir)
+    except OSError as e:
+        print(f"⚠️ Could not store render {render_key}: {e}")
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+def generate_song(data):
+    """Validate one song request, run it on the worker pool and build its response
+
+    Returns a (payload, status_code) tuple so both /generate and
+    /batch-generate can share the real generation path.
+    """
+    # Required fields
+    required_fields = ['lyrics', 'genre']
+    for field in required_fields:
+        if field not in data:
+            return {'error': f'Missing required field: {field}'}, 400
+
+    # Extract parameters with defaults
+    lyrics = data['lyrics'].strip()
+    genre = data.get('genre', 'pop')
+    tempo = data.get('tempo', 120)
+    key_sig = data.get('key', 'C')
+    title = data.get('title')
+    duration = data.get('duration', 30)
+    mood = data.get('mood', 'happy')
+
+    # Style options
+    style_options = data.get('style_options', {})
+    complexity = style_options.get('complexity', 'medium')
+    voice_leading = style_options.get('voice_leading', True)
+    dynamic_phrasing = style_options.get('dynamic_phrasing', True)
+
+    # Validate parameters
+    valid_genres = ['pop', 'rock', 'jazz', 'electronic', 'classical', 'hip-hop', 'country', 'r&b']
+    if genre not in valid_genres:
+        return {'error': f'Invalid genre. Must be one of: {valid_genres}'}, 400
+
+    if not (60 <= tempo <= 200):
+        return {'error': 'Tempo must be between 60 and 200 BPM'}, 400
+
+    if not (10 <= duration <= 300):
+        return {'error': 'Duration must be between 10 and 300 seconds'}, 400
+
+    if not lyrics:
+        return {'error': 'Lyrics cannot be empty'}, 400
+
+    # Generate unique filename
+    session_id = uuid.uuid4().hex
+    base_filename = f'generated_{session_id}'
+    midi_path = os.path.join(UPLOAD_FOLDER, f'{base_filename}.mid')
+    metadata_path = os.path.join(UPLOAD_FOLDER, f'{base_filename}_metadata.json')
+
+    # Deterministic requests are seeded from their parameters and served
+    # from the render cache when an identical request was rendered before.
+    # The key covers the requested title only, and an untitled deterministic
+    # request takes its default title from the key so repeats still match
+    render_key = None
+    if data.get('deterministic', False):
+        render_key = render_cache_key(title, lyrics, genre, tempo, key_sig, duration, style_options)
+    if title is None:
+        title = f'Generated Song {(render_key or uuid.uuid4().hex)[:8]}'
+
+    if render_key and restore_render(render_key, os.path.join(UPLOAD_FOLDER, base_filename)):
+        print(f"♻️ Served from render cache: {render_key}")
+        result = {'log': f'Served from render cache: {render_key}\n'}
+    else:
+        # Build job for the enhanced music21 generator workers
+        job = {
+            'title': title,
+            'lyrics': lyrics,
+            'genre': genre,
+            'tempo_bpm': tempo,
+            'key_sig': key_sig,
+            'duration_seconds': duration,
+            'output_path': midi_path,
+            'output_format': 'both' if complexity == 'complex' else 'midi'
+        }
+        if render_key:
+            job['seed'] = int(render_key[:16], 16)
+
+        # Execute music generation
+        print(f"🎵 Generating music: {title} ({genre}, {tempo} BPM, {key_sig})")
+
+        try:
+            result = get_generation_pool().submit(job)
+        except GenerationTimeout:
+            return {'error': 'Music generation timed out'}, 408
+        except GenerationError as e:
+            error_msg = e.details or str(e)
+            print(f"❌ Generation failed: {error_msg}")
+            return {
+                'error': 'Music generation failed',
+                'details': error_msg
+            }, 500
+
+        if render_key and os.path.exists(midi_path):
+            store_render(render_key, os.path.join(UPLOAD_FOLDER, base_filename))
+
+    # Verify files were created
+    if not os.path.exists(midi_path):
+        return {'error': 'MIDI file was not generated'}, 500
+
+    # Load metadata if it exists
+    metadata = {}
+    if os.path.exists(metadata_path):
+        try:
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Could not load metadata: {e}")
+
+    # Get file size and info
+    midi_size = os.path.getsize(midi_path)
+
+    # Prepare response
+    response_data = {
+        'success': True,
+        'session_id': session_id,
+        'files': {
+            'midi': {
+                'filename': f'{base_filename}.mid',
+                'size_bytes': midi_size,
+                'download_url': f'/download/{base_filename}.mid'
+            }
+        },
+        'metadata': {
+            'title': title,
+            'genre': genre,
+            'tempo': tempo,
+            'key': key_sig,
+            'duration': duration,
+            'mood': mood,
+            'generation_time': datetime.now().isoformat(),
+            'style_options': style_options,
+            **metadata
+        },
+        'generation_log': result['log']
+    }
+    if render_key:
+        response_data['render_key'] = render_key
+
+    # Add additional files if they exist
+    analysis_path = midi_path.replace('.mid', '_analysis.json')
+    if os.path.exists(analysis_path):
+        response_data['files']['analysis'] = {
+            'filename': f'{base_filename}_analysis.json',
+            'size_bytes': os.path.getsize(analysis_path),
+            'download_url': f'/download/{base_filename}_analysis.json'
+        }
+
+    musicxml_path = midi_path.replace('.mid', '.musicxml')
+    if os.path.exists(musicxml_path):
+        response_data['files']['musicxml'] = {
+            'filename': f'{base_filename}.musicxml',
+            'size_bytes': os.path.getsize(musicxml_path),
+            'download_url': f'/download/{base_filename}.musicxml'
+        }
+
+    return response_data, 200
+
 @app.route('/generate', methods=['POST'])
 def generate_music():
     """
@@ -52,8 +290,13 @@ def generate_music():
             "complexity": "simple|medium|complex",
             "voice_leading": true,
             "dynamic_phrasing": true
-        }
+        },
+        "deterministic": false
     }
+    
+    With "deterministic": true the generator is seeded from a hash of the
+    request, and repeats of an identical request are served from the
+    render cache via hard links instead of being regenerated.
     """
     try:
         # Validate request
@@ -62,151 +305,10 @@ def generate_music():
         
         data = request.get_json()
         
-        # Required fields
-        required_fields = ['lyrics', 'genre']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        payload, status_code = generate_song(data)
+        return jsonify(payload), status_code
         
-        # Extract parameters with defaults
-        lyrics = data['lyrics'].strip()
-        genre = data.get('genre', 'pop')
-        tempo = data.get('tempo', 120)
-        key_sig = data.get('key', 'C')
-        title = data.get('title', f'Generated Song {uuid.uuid4().hex[:8]}')
-        duration = data.get('duration', 30)
-        mood = data.get('mood', 'happy')
         
-        # Style options
-        style_options = data.get('style_options', {})
-        complexity = style_options.get('complexity', 'medium')
-        voice_leading = style_options.get('voice_leading', True)
-        dynamic_phrasing = style_options.get('dynamic_phrasing', True)
-        
-        # Validate parameters
-        valid_genres = ['pop', 'rock', 'jazz', 'electronic', 'classical', 'hip-hop', 'country', 'r&b']
-        if genre not in valid_genres:
-            return jsonify({'error': f'Invalid genre. Must be one of: {valid_genres}'}), 400
-        
-        if not (60 <= tempo <= 200):
-            return jsonify({'error': 'Tempo must be between 60 and 200 BPM'}), 400
-        
-        if not (10 <= duration <= 300):
-            return jsonify({'error': 'Duration must be between 10 and 300 seconds'}), 400
-        
-        if not lyrics:
-            return jsonify({'error': 'Lyrics cannot be empty'}), 400
-        
-        # Generate unique filename
-        session_id = uuid.uuid4().hex
-        base_filename = f'generated_{session_id}'
-        midi_path = os.path.join(UPLOAD_FOLDER, f'{base_filename}.mid')
-        metadata_path = os.path.join(UPLOAD_FOLDER, f'{base_filename}_metadata.json')
-        
-        # Build command for enhanced music21 generator
-        cmd = [
-            'python3',
-            'server/enhanced-music21-generator.py',
-            title,
-            lyrics,
-            genre,
-            str(tempo),
-            key_sig,
-            str(duration),
-            midi_path
-        ]
-        
-        # Add optional parameters
-        if complexity == 'complex':
-            cmd.extend(['--format=both'])
-        
-        if voice_leading and genre.lower() == 'jazz':
-            cmd.extend(['--voice-leading=enhanced'])
-        
-        if dynamic_phrasing:
-            cmd.extend(['--dynamic-phrasing=true'])
-        
-        # Execute music generation
-        print(f"🎵 Generating music: {' '.join(cmd)}")
-        
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=60  # 60 second timeout
-        )
-        
-        if result.returncode != 0:
-            error_msg = result.stderr or 'Unknown error during generation'
-            print(f"❌ Generation failed: {error_msg}")
-            return jsonify({
-                'error': 'Music generation failed',
-                'details': error_msg
-            }), 500
-        
-        # Verify files were created
-        if not os.path.exists(midi_path):
-            return jsonify({'error': 'MIDI file was not generated'}), 500
-        
-        # Load metadata if it exists
-        metadata = {}
-        if os.path.exists(metadata_path):
-            try:
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
-            except Exception as e:
-                print(f"⚠️ Could not load metadata: {e}")
-        
-        # Get file size and info
-        midi_size = os.path.getsize(midi_path)
-        
-        # Prepare response
-        response_data = {
-            'success': True,
-            'session_id': session_id,
-            'files': {
-                'midi': {
-                    'filename': f'{base_filename}.mid',
-                    'size_bytes': midi_size,
-                    'download_url': f'/download/{base_filename}.mid'
-                }
-            },
-            'metadata': {
-                'title': title,
-                'genre': genre,
-                'tempo': tempo,
-                'key': key_sig,
-                'duration': duration,
-                'mood': mood,
-                'generation_time': datetime.now().isoformat(),
-                'style_options': style_options,
-                **metadata
-            },
-            'generation_log': result.stdout
-        }
-        
-        # Add additional files if they exist
-        analysis_path = midi_path.replace('.mid', '_analysis.json')
-        if os.path.exists(analysis_path):
-            response_data['files']['analysis'] = {
-                'filename': f'{base_filename}_analysis.json',
-                'size_bytes': os.path.getsize(analysis_path),
-                'download_url': f'/download/{base_filename}_analysis.json'
-            }
-        
-        musicxml_path = midi_path.replace('.mid', '.musicxml')
-        if os.path.exists(musicxml_path):
-            response_data['files']['musicxml'] = {
-                'filename': f'{base_filename}.musicxml',
-                'size_bytes': os.path.getsize(musicxml_path),
-                'download_url': f'/download/{base_filename}.musicxml'
-            }
-        
-        return jsonify(response_data)
-        
-    except subprocess.TimeoutExpired:
-        return jsonify({'error': 'Music generation timed out'}), 408
-    
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
         print(traceback.format_exc())
@@ -262,8 +364,15 @@ def batch_generate():
         "common_options": {
             "tempo": 120,
             "key": "C"
-        }
+        },
+        "concurrency": 4
     }
+    
+    Songs run on the generator worker pool with at most `concurrency` in
+    flight. The response is NDJSON: a batch header line, one line per song
+    in completion order, then a summary line. New songs are only submitted
+    as the client reads finished results, so slow readers apply
+    backpressure to the batch.
     """
     try:
         data = request.get_json()
@@ -273,48 +382,80 @@ def batch_generate():
         if not songs:
             return jsonify({'error': 'No songs provided'}), 400
         
-        if len(songs) > 10:
-            return jsonify({'error': 'Maximum 10 songs per batch'}), 400
+        if len(songs) > BATCH_MAX_SONGS:
+            return jsonify({'error': f'Maximum {BATCH_MAX_SONGS} songs per batch'}), 400
         
-        results = []
-        
-        for i, song_data in enumerate(songs):
-            try:
-                # Merge common options
-                merged_data = {**common_options, **song_data}
-                
-                # Use internal generation logic
-                # (This would call the same generation logic as the single endpoint)
-                print(f"🎵 Processing batch song {i+1}/{len(songs)}: {merged_data.get('title', 'Untitled')}")
-                
-                # For now, return placeholder - in production this would do actual generation
-                results.append({
-                    'index': i,
-                    'title': song_data.get('title', f'Song {i+1}'),
-                    'status': 'generated',
-                    'session_id': uuid.uuid4().hex
-                })
-                
-            except Exception as e:
-                results.append({
-                    'index': i,
-                    'title': song_data.get('title', f'Song {i+1}'),
-                    'status': 'failed',
-                    'error': str(e)
-                })
-        
-        return jsonify({
-            'success': True,
-            'batch_id': uuid.uuid4().hex,
-            'total_songs': len(songs),
-            'results': results
-        })
+        batch_id = uuid.uuid4().hex
         
     except Exception as e:
         return jsonify({
             'error': 'Batch generation failed',
             'details': str(e)
         }), 500
+    
+    # A malformed concurrency is a client error, not a failed batch
+    try:
+        concurrency = int(data.get('concurrency', GENERATION_WORKERS))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'concurrency must be an integer'}), 400
+    concurrency = max(1, min(concurrency, GENERATION_WORKERS))
+    
+    def generate_one(i, song_data):
+        # Merge common options
+        merged_data = {**common_options, **song_data}
+        print(f"🎵 Processing batch song {i+1}/{len(songs)}: {merged_data.get('title', 'Untitled')}")
+        
+        try:
+            payload, status_code = generate_song(merged_data)
+        except Exception as e:
+            payload, status_code = {'error': str(e)}, 500
+        
+        result = {
+            'index': i,
+            'title': song_data.get('title', f'Song {i+1}'),
+            'status': 'generated' if status_code == 200 else 'failed'
+        }
+        if status_code == 200:
+            result['session_id'] = payload['session_id']
+            result['files'] = payload['files']
+        else:
+            result['error'] = payload.get('error')
+            if payload.get('details'):
+                result['details'] = payload['details']
+        return result
+    
+    def stream_results():
+        yield json.dumps({'batch_id': batch_id, 'total_songs': len(songs), 'concurrency': concurrency}) + '\n'
+        
+        succeeded = 0
+        pending_songs = iter(enumerate(songs))
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            in_flight = set()
+            for i, song_data in pending_songs:
+                in_flight.add(executor.submit(generate_one, i, song_data))
+                if len(in_flight) >= concurrency:
+                    break
+            
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    succeeded += result['status'] == 'generated'
+                    yield json.dumps(result) + '\n'
+                    
+                    # Refill the freed slot only after the result was handed to the client
+                    next_song = next(pending_songs, None)
+                    if next_song is not None:
+                        in_flight.add(executor.submit(generate_one, *next_song))
+        
+        yield json.dumps({
+            'batch_id': batch_id,
+            'complete': True,
+            'succeeded': succeeded,
+            'failed': len(songs) - succeeded
+        }) + '\n'
+    
+    return Response(stream_with_context(stream_results()), mimetype='application/x-ndjson')
 
 @app.route('/genres', methods=['GET'])
 def get_genres():
@@ -388,11 +529,11 @@ def api_documentation():
                 'method': 'POST',
                 'description': 'Generate music from lyrics',
                 'required_params': ['lyrics', 'genre'],
-                'optional_params': ['tempo', 'key', 'title', 'duration', 'mood', 'style_options']
+                'optional_params': ['tempo', 'key', 'title', 'duration', 'mood', 'style_options', 'deterministic']
             },
             '/batch-generate': {
                 'method': 'POST',
-                'description': 'Generate multiple songs in batch'
+                'description': 'Generate multiple songs in parallel, streaming one NDJSON line per finished song'
             },
             '/download/<filename>': {
                 'method': 'GET',
@@ -434,6 +575,11 @@ if __name__ == '__main__':
     print("📖 API Documentation available at: http://0.0.0.0:5000/api-docs")
     print("❤️ Health check available at: http://0.0.0.0:5000/health")
     
+    # Warm the generator workers before serving; the debug reloader's
+    # watcher process never serves requests, so it skips the pool
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        get_generation_pool()
+    
     app.run(
         host='0.0.0.0',
         port=5000,
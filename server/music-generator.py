@@ -5,8 +5,11 @@ import argparse
 import os
 import math
 import random
+import struct
 from pathlib import Path
 
+import numpy as np
+
 def generate_music(title, lyrics, genre, tempo, key, duration, output_path, instrumental_only=False):
     """Generate real musical composition with melody, harmony, and rhythm"""
     print(f"🎵 Generating music: {title}")
@@ -71,10 +74,6 @@ def generate_music(title, lyrics, genre, tempo, key, duration, output_path, inst
 def generate_composition(scale_notes, chord_progression, tempo, duration_samples, sample_rate, genre, lyrics, instrumental_only):
     """Generate a complete musical composition with multiple layers"""
 
-    # Initialize stereo audio data
-    left_channel = [0.0] * duration_samples
-    right_channel = [0.0] * duration_samples
-
     # Time parameters
     beats_per_second = tempo / 60.0
     samples_per_beat = int(sample_rate / beats_per_second)
@@ -92,33 +91,35 @@ def generate_composition(scale_notes, chord_progression, tempo, duration_samples
     # Generate drums/percussion
     drums = generate_drum_pattern(total_beats, samples_per_beat, genre)
 
-    # Mix all elements together
-    for i in range(duration_samples):
-        # Combine all musical elements with appropriate volumes
-        melody_volume = 0.4 if not instrumental_only else 0.6
-        left_sample = (
-            melody[i] * melody_volume +           # Lead melody
-            bass[i] * 0.3 +             # Bass line
-            chords[i] * 0.2 +           # Chord accompaniment
-            drums[i] * 0.1              # Percussion
-        )
+    # Layers only cover whole beats; pad the trailing partial beat with silence
+    melody, bass, chords, drums = (
+        fit_to_length(layer, duration_samples) for layer in (melody, bass, chords, drums)
+    )
 
-        right_sample = (
-            melody[i] * (melody_volume - 0.05) +          # Slightly different mix for stereo
-            bass[i] * 0.3 +
-            chords[i] * 0.25 +
-            drums[i] * 0.1
-        )
+    # Mix all elements together with appropriate volumes
+    melody_volume = 0.4 if not instrumental_only else 0.6
+    left_mix = (
+        melody * melody_volume +             # Lead melody
+        bass * 0.3 +                         # Bass line
+        chords * 0.2 +                       # Chord accompaniment
+        drums * 0.1                          # Percussion
+    )
+    right_mix = (
+        melody * (melody_volume - 0.05) +    # Slightly different mix for stereo
+        bass * 0.3 +
+        chords * 0.25 +
+        drums * 0.1
+    )
 
-        # Apply gentle compression and limiting
-        left_channel[i] = max(-1.0, min(1.0, left_sample * 0.8))
-        right_channel[i] = max(-1.0, min(1.0, right_sample * 0.8))
+    # Apply gentle compression and limiting
+    left_channel = np.clip(left_mix * 0.8, -1.0, 1.0)
+    right_channel = np.clip(right_mix * 0.8, -1.0, 1.0)
 
     return left_channel, right_channel
 
 def generate_melody(scale_notes, total_beats, samples_per_beat, genre, lyrics):
     """Generate an expressive melody line with lyrics-driven phrasing"""
-    melody = [0.0] * (total_beats * samples_per_beat)
+    melody = np.zeros(total_beats * samples_per_beat)
 
     # Analyze lyrics for melodic inspiration
     words = lyrics.lower().split() if lyrics else ['la', 'la', 'la', 'la']
@@ -153,24 +154,22 @@ def generate_melody(scale_notes, total_beats, samples_per_beat, genre, lyrics):
         # Generate note with vibrato and expression
         start_sample = beat * samples_per_beat
         end_sample = min((beat + note_duration) * samples_per_beat, len(melody))
+        t = note_time(end_sample - start_sample, samples_per_beat)
 
-        for i in range(start_sample, end_sample):
-            t = (i - start_sample) / samples_per_beat
-
-            # Add vibrato (slight frequency modulation)
-            vibrato = 1.0 + 0.02 * math.sin(2 * math.pi * 5 * t)
+        # Add vibrato (slight frequency modulation)
+        vibrato = 1.0 + 0.02 * np.sin(2 * np.pi * 5 * t)
 
-            # Add envelope (attack, sustain, release)
-            envelope = calculate_envelope(t, note_duration)
+        # Add envelope (attack, sustain, release)
+        envelope = envelope_curve(t, note_duration)
 
-            # Generate the note
-            melody[i] = envelope * 0.6 * math.sin(2 * math.pi * note_freq * vibrato * t / samples_per_beat)
+        # Generate the note
+        melody[start_sample:end_sample] = envelope * 0.6 * np.sin(2 * np.pi * note_freq * vibrato * t / samples_per_beat)
 
     return melody
 
 def generate_bass_line(chord_progression, total_beats, samples_per_beat, genre):
     """Generate a rhythmic bass line"""
-    bass = [0.0] * (total_beats * samples_per_beat)
+    bass = np.zeros(total_beats * samples_per_beat)
 
     chord_duration = 4  # Each chord lasts 4 beats
     bass_pattern = get_bass_pattern(genre)
@@ -182,18 +181,17 @@ def generate_bass_line(chord_progression, total_beats, samples_per_beat, genre):
         pattern_index = beat % len(bass_pattern)
         if bass_pattern[pattern_index]:  # Play bass note
             start_sample = beat * samples_per_beat
-            end_sample = start_sample + samples_per_beat
+            end_sample = min(start_sample + samples_per_beat, len(bass))
+            t = note_time(end_sample - start_sample, samples_per_beat)
 
-            for i in range(start_sample, min(end_sample, len(bass))):
-                t = (i - start_sample) / samples_per_beat
-                envelope = max(0, 1 - t * 2)  # Quick decay
-                bass[i] = envelope * 0.8 * math.sin(2 * math.pi * bass_freq * t)
+            envelope = np.maximum(0, 1 - t * 2)  # Quick decay
+            bass[start_sample:end_sample] = envelope * 0.8 * np.sin(2 * np.pi * bass_freq * t)
 
     return bass
 
 def generate_chord_accompaniment(chord_progression, total_beats, samples_per_beat, genre):
     """Generate chord accompaniment"""
-    chords = [0.0] * (total_beats * samples_per_beat)
+    chords = np.zeros(total_beats * samples_per_beat)
 
     chord_duration = 4
     strum_pattern = get_strum_pattern(genre)
@@ -205,51 +203,64 @@ def generate_chord_accompaniment(chord_progression, total_beats, samples_per_bea
         pattern_index = beat % len(strum_pattern)
         if strum_pattern[pattern_index]:
             start_sample = beat * samples_per_beat
-            end_sample = start_sample + samples_per_beat // 2
+            end_sample = min(start_sample + samples_per_beat // 2, len(chords))
+            t = note_time(end_sample - start_sample, samples_per_beat)
 
             # Generate major triad
             frequencies = [root_freq, root_freq * 1.25, root_freq * 1.5]  # Root, third, fifth
 
-            for i in range(start_sample, min(end_sample, len(chords))):
-                t = (i - start_sample) / samples_per_beat
-                envelope = max(0, 1 - t * 3)
+            envelope = np.maximum(0, 1 - t * 3)
 
-                chord_sample = 0
-                for freq in frequencies:
-                    chord_sample += 0.3 * math.sin(2 * math.pi * freq * t)
+            chord_sample = np.zeros(len(t))
+            for freq in frequencies:
+                chord_sample += 0.3 * np.sin(2 * np.pi * freq * t)
 
-                chords[i] = envelope * chord_sample
+            chords[start_sample:end_sample] = envelope * chord_sample
 
     return chords
 
 def generate_drum_pattern(total_beats, samples_per_beat, genre):
     """Generate basic drum pattern"""
-    drums = [0.0] * (total_beats * samples_per_beat)
+    drums = np.zeros(total_beats * samples_per_beat)
 
     kick_pattern, snare_pattern = get_drum_patterns(genre)
 
+    # Snare noise comes from a NumPy generator seeded off the module RNG so
+    # seeded runs stay reproducible without a per-sample random.uniform call
+    noise_rng = np.random.default_rng(random.getrandbits(64))
+
     for beat in range(total_beats):
         start_sample = beat * samples_per_beat
 
         # Kick drum
         if kick_pattern[beat % len(kick_pattern)]:
-            for i in range(start_sample, min(start_sample + samples_per_beat // 4, len(drums))):
-                t = (i - start_sample) / samples_per_beat
-                envelope = max(0, 1 - t * 8)
-                drums[i] += envelope * 0.5 * math.sin(2 * math.pi * 60 * t)  # Low frequency kick
+            end_sample = min(start_sample + samples_per_beat // 4, len(drums))
+            t = note_time(end_sample - start_sample, samples_per_beat)
+            envelope = np.maximum(0, 1 - t * 8)
+            drums[start_sample:end_sample] += envelope * 0.5 * np.sin(2 * np.pi * 60 * t)  # Low frequency kick
 
         # Snare drum
         if snare_pattern[beat % len(snare_pattern)]:
-            for i in range(start_sample, min(start_sample + samples_per_beat // 6, len(drums))):
-                t = (i - start_sample) / samples_per_beat
-                envelope = max(0, 1 - t * 10)
-                # Snare = filtered noise + tone
-                noise = random.uniform(-1, 1) * 0.3
-                tone = 0.2 * math.sin(2 * math.pi * 200 * t)
-                drums[i] += envelope * (noise + tone)
+            end_sample = min(start_sample + samples_per_beat // 6, len(drums))
+            t = note_time(end_sample - start_sample, samples_per_beat)
+            envelope = np.maximum(0, 1 - t * 10)
+            # Snare = filtered noise + tone
+            noise = noise_rng.uniform(-1, 1, len(t)) * 0.3
+            tone = 0.2 * np.sin(2 * np.pi * 200 * t)
+            drums[start_sample:end_sample] += envelope * (noise + tone)
 
     return drums
 
+def note_time(num_samples, samples_per_beat):
+    """Time axis of a note block, measured in beats from the note onset"""
+    return np.arange(num_samples) / samples_per_beat
+
+def fit_to_length(layer, num_samples):
+    """Zero-pad or trim a rendered layer to exactly num_samples"""
+    if len(layer) >= num_samples:
+        return layer[:num_samples]
+    return np.pad(layer, (0, num_samples - len(layer)))
+
 def get_scale_frequencies(root_freq, genre):
     """Get scale frequencies based on genre"""
     # Major scale ratios
@@ -403,33 +414,124 @@ def calculate_envelope(t, note_duration):
     else:
         return 1.0
 
-def write_stereo_wav(output_path, audio_data, sample_rate):
+def envelope_curve(t, note_duration):
+    """Array form of calculate_envelope for a whole block of note times"""
+    attack_time = 0.1
+    release_time = 0.3
+
+    return np.where(
+        t < attack_time,
+        t / attack_time,
+        np.where(t > note_duration - release_time, (note_duration - t) / release_time, 1.0)
+    )
+
+# Sample formats supported by WavWriter: (WAVE format tag, bytes per sample)
+WAV_SAMPLE_FORMATS = {
+    'pcm16': (1, 2),     # WAVE_FORMAT_PCM
+    'pcm24': (1, 3),     # WAVE_FORMAT_PCM
+    'float32': (3, 4),   # WAVE_FORMAT_IEEE_FLOAT
+}
+
+# Frames encoded per write call; bounds the temporary interleave buffer
+WAV_CHUNK_FRAMES = 1 << 18
+
+class WavWriter:
+    """Bulk WAV writer that interleaves channel blocks into one buffer per write.
+
+    Usable in one shot through write_stereo_wav, or as a streaming writer
+    that accepts rendered blocks as they arrive; the RIFF and data sizes
+    are patched into the header on close.
+    """
+
+    def __init__(self, output_path, sample_rate, channels=2, sample_format='pcm16'):
+        if sample_format not in WAV_SAMPLE_FORMATS:
+            raise ValueError(f"Unsupported WAV sample format: {sample_format}")
+
+        self.output_path = output_path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.format_tag, self.sample_width = WAV_SAMPLE_FORMATS[sample_format]
+        self.frames_written = 0
+        self._file = open(output_path, 'wb')
+        self._file.write(self._header(0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _header(self, num_frames):
+        """Build the RIFF/fmt/(fact)/data header for num_frames frames"""
+        block_align = self.channels * self.sample_width
+        data_size = num_frames * block_align
+        is_float = self.format_tag == 3
+
+        # Non-PCM formats carry a cbSize field and a fact chunk
+        fmt_chunk = struct.pack(
+            '<HHIIHH',
+            self.format_tag,
+            self.channels,
+            self.sample_rate,
+            self.sample_rate * block_align,
+            block_align,
+            self.sample_width * 8,
+        )
+        if is_float:
+            fmt_chunk += struct.pack('<H', 0)
+        fact_chunk = b'fact' + struct.pack('<II', 4, num_frames) if is_float else b''
+
+        riff_size = 4 + (8 + len(fmt_chunk)) + len(fact_chunk) + (8 + data_size)
+        return (
+            b'RIFF' + struct.pack('<I', riff_size) + b'WAVE' +
+            b'fmt ' + struct.pack('<I', len(fmt_chunk)) + fmt_chunk +
+            fact_chunk +
+            b'data' + struct.pack('<I', data_size)
+        )
+
+    def _encode(self, frames):
+        """Convert a (frames, channels) float block to interleaved sample bytes"""
+        frames = np.clip(frames, -1.0, 1.0)
+
+        if self.sample_format == 'float32':
+            return np.ascontiguousarray(frames, dtype='<f4')
+        if self.sample_format == 'pcm16':
+            return np.ascontiguousarray(frames * 32767, dtype='<i2')
+
+        # 24-bit: take the low three bytes of each little-endian int32 sample
+        samples = np.ascontiguousarray(frames * 8388607, dtype='<i4')
+        return np.ascontiguousarray(samples.view(np.uint8).reshape(-1, 4)[:, :3])
+
+    def write_block(self, *channel_blocks):
+        """Append one block of samples, one array per channel"""
+        if len(channel_blocks) != self.channels:
+            raise ValueError(f"Expected {self.channels} channel blocks, got {len(channel_blocks)}")
+
+        channel_blocks = [np.asarray(block, dtype=np.float64) for block in channel_blocks]
+        num_frames = len(channel_blocks[0])
+        if any(len(block) != num_frames for block in channel_blocks):
+            raise ValueError("Channel blocks must have the same length")
+
+        for offset in range(0, num_frames, WAV_CHUNK_FRAMES):
+            frames = np.column_stack([block[offset:offset + WAV_CHUNK_FRAMES] for block in channel_blocks])
+            self._file.write(self._encode(frames))
+        self.frames_written += num_frames
+
+    def close(self):
+        """Patch the header sizes and close the file"""
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._file.write(self._header(self.frames_written))
+        self._file.close()
+
+def write_stereo_wav(output_path, audio_data, sample_rate, sample_format='pcm16'):
     """Write stereo WAV file"""
     left_channel, right_channel = audio_data
-    duration_samples = len(left_channel)
-
-    with open(output_path, 'wb') as f:
-        # WAV header for stereo
-        f.write(b'RIFF')
-        f.write((36 + duration_samples * 4).to_bytes(4, 'little'))  # 4 bytes per sample (stereo)
-        f.write(b'WAVE')
-        f.write(b'fmt ')
-        f.write((16).to_bytes(4, 'little'))
-        f.write((1).to_bytes(2, 'little'))   # PCM
-        f.write((2).to_bytes(2, 'little'))   # Stereo
-        f.write(sample_rate.to_bytes(4, 'little'))
-        f.write((sample_rate * 4).to_bytes(4, 'little'))
-        f.write((4).to_bytes(2, 'little'))
-        f.write((16).to_bytes(2, 'little'))
-        f.write(b'data')
-        f.write((duration_samples * 4).to_bytes(4, 'little'))
-
-        # Write interleaved stereo samples
-        for i in range(duration_samples):
-            left_sample = int(32767 * max(-1, min(1, left_channel[i])))
-            right_sample = int(32767 * max(-1, min(1, right_channel[i])))
-            f.write(left_sample.to_bytes(2, 'little', signed=True))
-            f.write(right_sample.to_bytes(2, 'little', signed=True))
+
+    with WavWriter(output_path, sample_rate, channels=2, sample_format=sample_format) as writer:
+        writer.write_block(left_channel, right_channel)
 
 def get_base_frequency(key):
     """Get base frequency for musical key"""
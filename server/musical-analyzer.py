@@ -25,15 +25,288 @@ class AnalysisConfig:
     detailed_chord_analysis: bool = False
     extended_metrics: bool = False
 
+# One row per pitched note, chord member or rest, in onset order
+NOTE_DTYPE = np.dtype([
+    ('onset', np.float64),     # quarter lengths from the start of the score
+    ('duration', np.float64),  # quarter lengths
+    ('midi', np.int16),        # -1 for rests and unpitched notes
+    ('velocity', np.int16),    # -1 when the note carries no velocity
+    ('part', np.int16),
+    ('chord_id', np.int32)     # index into NoteTable.chords, -1 outside chords
+])
+
+@dataclass
+class NoteTable:
+    """Notes and markings of a score, extracted once and shared by the analyses"""
+    notes: np.ndarray
+    chords: List[chord.Chord]
+    time_signatures: List[Dict]
+    key_signatures: List[Dict]
+    tempo_markings: List[Dict]
+    duration: float
+    time_signature: Optional[meter.TimeSignature] = None  # first one in the score
+
+    @property
+    def events(self) -> np.ndarray:
+        """One row per note, rest or chord (its first member)"""
+        chord_ids = self.notes['chord_id']
+        first = np.ones(len(chord_ids), dtype=bool)
+        first[1:] = (chord_ids[1:] < 0) | (chord_ids[1:] != chord_ids[:-1])
+        return self.notes[first]
+
+    @property
+    def melody(self) -> np.ndarray:
+        """Single pitched notes, without chord members and rests"""
+        return self.notes[(self.notes['chord_id'] < 0) & (self.notes['midi'] >= 0)]
+
+def _velocity(element: note.NotRest) -> int:
+    if element.hasVolumeInformation() and element.volume.velocity is not None:
+        return int(element.volume.velocity)
+    return -1
+
+def _marking_measure(element) -> Optional[int]:
+    measure = element.getContextByClass('Measure')
+    return measure.measureNumber if measure is not None else None
+
+def extract_note_table(composition_stream: stream.Stream) -> NoteTable:
+    """Flatten a score into a NoteTable with a single walk over each part"""
+    if composition_stream.hasPartLikeStreams():
+        parts = list(composition_stream.parts)
+    else:
+        parts = [composition_stream]
+
+    rows = []
+    chords = []
+    time_signatures, key_signatures, tempo_markings = [], [], []
+    first_time_signature = None
+    for part_idx, part in enumerate(parts):
+        for element in part.flatten():
+            if isinstance(element, note.GeneralNote):
+                onset = float(element.offset)
+                length = float(element.quarterLength)
+                if isinstance(element, chord.Chord):
+                    velocity = _velocity(element)
+                    for chord_pitch in element.pitches:
+                        rows.append((onset, length, chord_pitch.midi, velocity, part_idx, len(chords)))
+                    chords.append(element)
+                elif isinstance(element, note.Note):
+                    rows.append((onset, length, element.pitch.midi, _velocity(element), part_idx, -1))
+                else:
+                    rows.append((onset, length, -1, -1, part_idx, -1))
+            elif isinstance(element, meter.TimeSignature):
+                if first_time_signature is None:
+                    first_time_signature = element
+                time_signatures.append({
+                    'signature': str(element),
+                    'measure': _marking_measure(element)
+                })
+            elif isinstance(element, key.KeySignature):
+                key_signatures.append({
+                    'signature': str(element),
+                    'measure': _marking_measure(element)
+                })
+            elif isinstance(element, tempo.TempoIndication):
+                tempo_markings.append({
+                    'tempo': str(element),
+                    'measure': _marking_measure(element)
+                })
+
+    # Interleave the parts by onset; the sort is stable, so chord members stay
+    # together and simultaneous events keep their part order
+    notes = np.array(rows, dtype=NOTE_DTYPE)
+    notes = notes[np.argsort(notes['onset'], kind='stable')]
+
+    # Number chords in onset order
+    chord_ids = notes['chord_id']
+    in_chord = chord_ids >= 0
+    if chords:
+        ids, first = np.unique(chord_ids[in_chord], return_index=True)
+        ordered = ids[np.argsort(first)]
+        renumber = np.empty(len(chords), dtype=np.int32)
+        renumber[ordered] = np.arange(len(ordered), dtype=np.int32)
+        chord_ids[in_chord] = renumber[chord_ids[in_chord]]
+        chords = [chords[i] for i in ordered]
+
+    return NoteTable(
+        notes=notes,
+        chords=chords,
+        time_signatures=time_signatures,
+        key_signatures=key_signatures,
+        tempo_markings=tempo_markings,
+        duration=float(composition_stream.duration.quarterLength),
+        time_signature=first_time_signature
+    )
+
+# Onsets within this many quarter lengths of a grid point count as on it
+GRID_TOLERANCE = 0.01
+
+def metrical_levels(time_signature: Optional[meter.TimeSignature]) -> List[float]:
+    """Grid spacing of each metrical level in quarter lengths, strongest first
+
+    Bar, half bar (for even beat counts above two), beat, then beat
+    subdivisions down to sixteenths; compound beats divide in three.
+    """
+    if time_signature is None:
+        time_signature = meter.TimeSignature('4/4')
+    bar = float(time_signature.barDuration.quarterLength)
+    beat = float(time_signature.beatDuration.quarterLength)
+
+    levels = [bar]
+    beat_count = round(bar / beat)
+    if beat_count > 2 and beat_count % 2 == 0:
+        levels.append(bar / 2)
+    if beat < bar:
+        levels.append(beat)
+    subdivision = beat / 3 if round(beat * 2) % 3 == 0 else beat / 2
+    while subdivision >= 0.25 - GRID_TOLERANCE:
+        levels.append(subdivision)
+        subdivision /= 2
+    return levels
+
+def metrical_weights(onsets: np.ndarray, levels: List[float]) -> np.ndarray:
+    """Longuet-Higgins & Lee weight of each onset
+
+    0 on the downbeat, -k on metrical level k and -len(levels) off the grid.
+    """
+    weights = np.full(len(onsets), -len(levels), dtype=np.int64)
+    # Levels nest, so the strongest level an onset falls on is written last
+    for k in range(len(levels) - 1, -1, -1):
+        position = onsets / levels[k]
+        on_grid = np.abs(position - np.round(position)) * levels[k] < GRID_TOLERANCE
+        weights[on_grid] = -k
+    return weights
+
+def strongest_weight_between(starts: np.ndarray, ends: np.ndarray, levels: List[float]) -> np.ndarray:
+    """Highest metrical weight strictly inside each (start, end) span
+
+    Spans that contain no grid point get -len(levels) - 1.
+    """
+    strongest = np.full(len(starts), -len(levels) - 1, dtype=np.int64)
+    for k in range(len(levels) - 1, -1, -1):
+        first_after = (np.floor((starts + GRID_TOLERANCE) / levels[k]) + 1) * levels[k]
+        strongest[first_after < ends - GRID_TOLERANCE] = -k
+    return strongest
+
+def suffix_array(sequence: np.ndarray) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """Suffix array of an integer sequence by prefix doubling
+
+    Also returns the rank of every position after each round: ranks[k][i]
+    orders the substrings sequence[i:i + 2**k], with 0 marking the end.
+    """
+    n = len(sequence)
+    rank = np.unique(sequence, return_inverse=True)[1].astype(np.int64) + 1
+    ranks = [rank.astype(np.int32)]
+    step = 1
+    while n and rank.max() < n:
+        following = np.zeros(n, dtype=np.int64)
+        following[:max(n - step, 0)] = rank[step:]
+        keys = rank * (n + 1) + following
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.cumsum(np.concatenate(([1], sorted_keys[1:] != sorted_keys[:-1])))
+        ranks.append(rank.astype(np.int32))
+        step *= 2
+    return np.argsort(rank, kind='stable'), ranks
+
+def lcp_array(sa: np.ndarray, ranks: List[np.ndarray]) -> np.ndarray:
+    """Longest common prefix of each suffix with the previous one in sa
+
+    Matches 2**k symbols at a time for k from the last doubling round down,
+    so all neighbouring pairs are compared together.
+    """
+    n = len(sa)
+    lcp = np.zeros(n, dtype=np.int64)
+    if n < 2:
+        return lcp
+    a = sa[:-1].astype(np.int64)
+    b = sa[1:].astype(np.int64)
+    common = np.zeros(n - 1, dtype=np.int64)
+    for k in range(len(ranks) - 1, -1, -1):
+        ia = a + common
+        ib = b + common
+        inside = np.flatnonzero((ia < n) & (ib < n))
+        same = ranks[k][ia[inside]] == ranks[k][ib[inside]]
+        common[inside[same]] += 1 << k
+    lcp[1:] = common
+    return lcp
+
+def _count_without_overlap(positions: np.ndarray, length: int) -> np.ndarray:
+    """Greedily keep occurrences that start after the previous kept one ends"""
+    kept = []
+    next_free = -1
+    for position in np.sort(positions).tolist():
+        if position >= next_free:
+            kept.append(position)
+            next_free = position + length
+    return np.array(kept, dtype=np.int64)
+
+def find_maximal_repeats(sequence: np.ndarray, min_length: int = 1, max_length: Optional[int] = None,
+                         top_k: Optional[int] = 10) -> List[Tuple[int, np.ndarray]]:
+    """Maximal repeats of an integer sequence, ranked by the symbols they cover
+
+    A repeat is maximal when extending it either way loses an occurrence.
+    These are the LCP intervals of the suffix array whose suffixes are not
+    all preceded by the same symbol. Occurrences are counted without
+    overlap and repeats covering the most symbols come first; longer
+    repeats are cut to max_length. Several sequences can be mined at once
+    by joining them with separator symbols that occur only once.
+    Returns (length, start positions) pairs.
+    """
+    sequence = np.asarray(sequence, dtype=np.int64)
+    n = len(sequence)
+    if n < 2:
+        return []
+    sa, ranks = suffix_array(sequence)
+    lcp = lcp_array(sa, ranks).tolist()
+
+    # Symbol before each suffix in suffix array order, distinct at the start
+    before = np.where(sa > 0, sequence[sa - 1], sequence.min() - 1 - np.arange(n))
+    left_changes = np.concatenate(([0], np.cumsum(before[1:] != before[:-1]))).tolist()
+
+    # Bottom-up walk over the LCP intervals
+    candidates = []
+    stack = [(0, 0)]
+    for i in range(1, n + 1):
+        current = lcp[i] if i < n else 0
+        left = i - 1
+        while current < stack[-1][0]:
+            length, left = stack.pop()
+            if length >= min_length and left_changes[i - 1] != left_changes[left]:
+                candidates.append((length, left, i - 1))
+        if current > stack[-1][0]:
+            stack.append((current, left))
+
+    # Overlapping occurrences bound the coverage from above, so candidates
+    # can stop being counted once the bound drops below the k-th best
+    def clipped(length):
+        return min(length, max_length) if max_length else length
+
+    candidates.sort(key=lambda c: -clipped(c[0]) * (c[2] - c[1] + 1))
+    repeats = []
+    seen = set()
+    for length, left, right in candidates:
+        length = clipped(length)
+        if top_k and len(repeats) >= top_k and length * (right - left + 1) < repeats[top_k - 1][0]:
+            break
+        positions = _count_without_overlap(sa[left:right + 1], length)
+        # Repeats cut to max_length can coincide
+        if len(positions) < 2 or (length, positions.tobytes()) in seen:
+            continue
+        seen.add((length, positions.tobytes()))
+        repeats.append((length * len(positions), length, positions))
+        if top_k:
+            repeats.sort(key=lambda r: (-r[0], -r[1]))
+            del repeats[top_k:]
+    repeats.sort(key=lambda r: (-r[0], -r[1]))
+    return [(length, positions) for _, length, positions in repeats]
+
 class MusicalAnalyzer:
     def __init__(self, config: AnalysisConfig = AnalysisConfig()):
         self.config = config
         self.analyzers = {
             'key': analysis.discrete.KrumhanslSchmuckler(),
-            'meter': analysis.metrical.TimeSignatureAnalyzer(),
-            'harmony': analysis.roman.RomanNumeralAnalyzer(),
-            'melodic': analysis.discrete.MelodicIntervalDiversity(),
-            'contour': analysis.contour.Contour()
+            'melodic': analysis.discrete.MelodicIntervalDiversity()
         }
 
     def analyze_composition(self, composition_stream: stream.Stream) -> Dict:
@@ -48,18 +321,21 @@ class MusicalAnalyzer:
         # Key analysis (always performed)
         analysis_results['key_analysis'] = self._analyze_key(composition_stream)
 
+        # Walk the score once; every analysis below reads the same note table
+        note_table = extract_note_table(composition_stream)
+
         # Optional analyses based on configuration
         if self.config.analyze_harmony:
-            analysis_results['harmony'] = self.analyze_harmonic_content(composition_stream)
+            analysis_results['harmony'] = self.analyze_harmonic_content(composition_stream, note_table)
 
         if self.config.analyze_rhythm:
-            analysis_results['rhythm'] = self.analyze_rhythmic_patterns(composition_stream)
+            analysis_results['rhythm'] = self.analyze_rhythmic_patterns(composition_stream, note_table)
 
         if self.config.analyze_melody:
-            analysis_results['melody'] = self.analyze_melodic_content(composition_stream)
+            analysis_results['melody'] = self.analyze_melodic_content(composition_stream, note_table)
 
         if self.config.analyze_structure:
-            analysis_results['structure'] = self.analyze_musical_structure(composition_stream)
+            analysis_results['structure'] = self.analyze_musical_structure(composition_stream, note_table)
 
         # Extended metrics if enabled
         if self.config.extended_metrics:
@@ -98,32 +374,41 @@ class MusicalAnalyzer:
         except:
             return []
 
-    def analyze_harmonic_content(self, composition_stream: stream.Stream) -> Dict:
+    def analyze_harmonic_content(self, composition_stream: stream.Stream,
+                                 note_table: Optional[NoteTable] = None) -> Dict:
         """Enhanced harmonic content analysis with roman numeral analysis"""
+        if note_table is None:
+            note_table = extract_note_table(composition_stream)
+
         chords_found = []
         chord_qualities = {}
         roman_numerals = []
-
-        for element in composition_stream.flat:
-            if isinstance(element, chord.Chord):
-                chord_symbol = element.pitchedCommonName
-                chords_found.append(chord_symbol)
-
-                # Enhanced chord quality analysis
-                quality = self._get_enhanced_chord_quality(element)
-                chord_qualities[chord_symbol] = quality
-
-                # Roman numeral analysis if detailed
-                if self.config.detailed_chord_analysis:
-                    try:
-                        rn = roman.romanNumeralFromChord(element, composition_stream.analyze('key'))
-                        roman_numerals.append({
-                            'roman': str(rn),
-                            'figure': rn.figure,
-                            'function': rn.function
-                        })
-                    except:
-                        pass
+        # Key context for roman numerals, detected once on the first chord
+        # rather than re-running Krumhansl-Schmuckler over the score per chord
+        key_context = None
+
+        for element in note_table.chords:
+            chord_symbol = element.pitchedCommonName
+            chords_found.append(chord_symbol)
+
+            # Enhanced chord quality analysis
+            quality = self._get_enhanced_chord_quality(element)
+            chord_qualities[chord_symbol] = quality
+
+            # Roman numeral analysis if detailed
+            if self.config.detailed_chord_analysis:
+                try:
+                    if key_context is None:
+                        key_context = composition_stream.analyze('key')
+                    rn = roman.romanNumeralFromChord(element, key_context)
+                    function = analysis.harmonicFunction.romanToFunction(rn)
+                    roman_numerals.append({
+                        'roman': str(rn),
+                        'figure': rn.figure,
+                        'function': str(function) if function else None
+                    })
+                except:
+                    pass
 
         # Enhanced progression analysis
         progression_analysis = self._analyze_progressions(chords_found)
@@ -214,17 +499,15 @@ class MusicalAnalyzer:
         except:
             return []
 
-    def analyze_rhythmic_patterns(self, composition_stream: stream.Stream) -> Dict:
+    def analyze_rhythmic_patterns(self, composition_stream: stream.Stream,
+                                  note_table: Optional[NoteTable] = None) -> Dict:
         """Enhanced rhythmic analysis with pattern recognition"""
-        durations = []
-        onset_times = []
-        current_time = 0.0
+        if note_table is None:
+            note_table = extract_note_table(composition_stream)
 
-        for element in composition_stream.flat.notesAndRests:
-            if hasattr(element, 'quarterLength'):
-                durations.append(element.quarterLength)
-                onset_times.append(current_time)
-                current_time += element.quarterLength
+        events = note_table.events
+        durations = events['duration']
+        onset_times = events['onset']
 
         # Calculate advanced rhythmic statistics
         duration_stats = {
@@ -235,93 +518,118 @@ class MusicalAnalyzer:
         }
 
         # Calculate syncopation score
-        syncopation_score = self._calculate_syncopation(durations, onset_times)
+        levels = metrical_levels(note_table.time_signature)
+        syncopation_score = self._calculate_syncopation(events, levels)
 
         return {
             'total_events': len(durations),
-            'unique_durations': len(set(durations)),
-            'rhythmic_density': len(durations) / composition_stream.duration.quarterLength if composition_stream.duration.quarterLength > 0 else 0,
+            'unique_durations': len(np.unique(durations)),
+            'rhythmic_density': len(durations) / note_table.duration if note_table.duration > 0 else 0,
             'duration_statistics': duration_stats,
             'syncopation_score': syncopation_score,
             'common_patterns': self._identify_rhythmic_patterns(durations),
             'onset_distribution': self._analyze_onset_distribution(onset_times)
         }
 
-    def _calculate_syncopation(self, durations: List[float], onset_times: List[float]) -> float:
-        """Calculate syncopation score using Longuet-Higgins & Lee method"""
-        if len(durations) < 3:
-            return 0.0
+    def _calculate_syncopation(self, events: np.ndarray, levels: List[float]) -> float:
+        """Calculate syncopation score using Longuet-Higgins & Lee method
 
-        # Find beats where notes start on offbeats
-        beat_positions = np.arange(0, max(onset_times) + 1, 0.25)  # Assume 4/4 for simplicity
-        syncopation_count = 0
+        A note that sounds (or is followed by rests) through a metrically
+        stronger position than its own onset, before the next note of its
+        part starts, scores the difference in weight. Returns the mean over
+        all notes.
+        """
+        notes = events[events['midi'] >= 0]
+        if len(notes) < 3:
+            return 0.0
 
-        for onset in onset_times:
-            # Check if onset is not on a beat
-            if not any(np.isclose(onset, beat_positions, atol=0.01)):
-                syncopation_count += 1
+        # A note lasts until the next later onset in its part; the last one
+        # in each part until its own end
+        notes = notes[np.lexsort((notes['onset'], notes['part']))]
+        onsets = notes['onset']
+        parts = notes['part'].astype(np.int64)
+        # Shifting each part past the previous one keeps a single sorted key
+        keys = onsets + parts * (onsets.max() + 1.0)
+        later = np.searchsorted(keys, keys + GRID_TOLERANCE, side='right')
+        ends = onsets + notes['duration']
+        has_next = later < len(notes)
+        same_part = np.zeros(len(notes), dtype=bool)
+        same_part[has_next] = parts[later[has_next]] == parts[has_next]
+        ends[same_part] = onsets[later[same_part]]
+
+        syncopation = strongest_weight_between(onsets, ends, levels) - metrical_weights(onsets, levels)
+        return float(np.clip(syncopation, 0, None).sum() / len(notes))
+
+    def _identify_rhythmic_patterns(self, durations: np.ndarray, min_length: int = 2,
+                                    max_length: int = 4, top_k: int = 10) -> List[Dict]:
+        """Most frequent duration n-grams, counted by sorting windows of duration codes"""
+        # Quantize to 1/48 quarter so triplets and float noise compare equal
+        ticks = np.round(np.asarray(durations, dtype=np.float64) * 48).astype(np.int64)
+        values, codes = np.unique(ticks, return_inverse=True)
+
+        patterns = []
+        for length in range(min_length, min(max_length, len(codes)) + 1):
+            windows = np.lib.stride_tricks.sliding_window_view(codes, length)
+            found, counts = np.unique(windows, axis=0, return_counts=True)
+            repeated = np.flatnonzero(counts > 1)
+            repeated = repeated[np.argsort(-counts[repeated], kind='stable')[:top_k]]
+            patterns.extend(
+                {
+                    'durations': (values[found[i]] / 48).tolist(),
+                    'count': int(counts[i]),
+                    'length': length
+                }
+                for i in repeated
+            )
 
-        return syncopation_count / len(onset_times)
+        return sorted(patterns, key=lambda x: (-x['count'], -x['length']))[:top_k]
 
-    def _analyze_onset_distribution(self, onset_times: List[float]) -> Dict:
+    def _analyze_onset_distribution(self, onset_times: np.ndarray) -> Dict:
         """Analyze distribution of note onsets"""
-        if not onset_times:
+        if not len(onset_times):
             return {}
 
         # Bin onsets by beat position (0-1)
-        beat_positions = [t % 1 for t in onset_times]
+        beat_positions = np.asarray(onset_times) % 1
         hist, bin_edges = np.histogram(beat_positions, bins=8, range=(0, 1))
 
         return {
             'histogram': hist.tolist(),
             'bin_edges': bin_edges.tolist(),
-            'preference_ratio': float(max(hist)) / min(hist) if min(hist) > 0 else float('inf')
+            'preference_ratio': float(hist.max()) / hist.min() if hist.min() > 0 else float('inf')
         }
 
-    def analyze_melodic_content(self, composition_stream: stream.Stream) -> Dict:
+    def analyze_melodic_content(self, composition_stream: stream.Stream,
+                                note_table: Optional[NoteTable] = None) -> Dict:
         """Enhanced melodic analysis with contour classification"""
-        notes_found = []
-        intervals = []
-        contours = []
-
-        previous_pitch = None
-        for element in composition_stream.flat.notes:
-            if isinstance(element, note.Note):
-                current_pitch = element.pitch
-                notes_found.append({
-                    'pitch': str(current_pitch),
-                    'midi': current_pitch.midi,
-                    'duration': element.duration.quarterLength
-                })
+        if note_table is None:
+            note_table = extract_note_table(composition_stream)
 
-                if previous_pitch:
-                    interval_obj = interval.Interval(previous_pitch, current_pitch)
-                    intervals.append(interval_obj.semitones)
-                    contours.append(1 if interval_obj.semitones > 0 else (-1 if interval_obj.semitones < 0 else 0))
-
-                previous_pitch = current_pitch
+        midi = note_table.melody['midi'].astype(np.int64)
+        intervals = np.diff(midi)
+        contours = np.sign(intervals)
 
         # Calculate advanced melodic statistics
-        if intervals:
+        if len(intervals):
             interval_stats = {
                 'mean': float(np.mean(np.abs(intervals))),
                 'std_dev': float(np.std(intervals)),
-                'direction_changes': sum(1 for i in range(len(contours)-1) if contours[i] != contours[i+1])
+                'direction_changes': int(np.count_nonzero(contours[1:] != contours[:-1]))
             }
         else:
             interval_stats = {}
 
         return {
-            'total_notes': len(notes_found),
+            'total_notes': len(midi),
             'pitch_range': {
-                'lowest': min(n['midi'] for n in notes_found) if notes_found else 0,
-                'highest': max(n['midi'] for n in notes_found) if notes_found else 0,
-                'span': (max(n['midi'] for n in notes_found) - min(n['midi'] for n in notes_found)) if notes_found else 0
+                'lowest': int(midi.min()) if len(midi) else 0,
+                'highest': int(midi.max()) if len(midi) else 0,
+                'span': int(midi.max() - midi.min()) if len(midi) else 0
             },
             'interval_statistics': interval_stats,
-            'contour_analysis': self._classify_melodic_contour(contours),
-            'pitch_class_distribution': self._analyze_pitch_classes(notes_found),
-            'motif_analysis': self._identify_melodic_motifs(notes_found)
+            'contour_analysis': self._classify_melodic_contour(contours.tolist()),
+            'pitch_class_distribution': self._analyze_pitch_classes(midi),
+            'motif_analysis': self._identify_melodic_motifs(midi)
         }
 
     def _classify_melodic_contour(self, contours: List[int]) -> Dict:
@@ -371,12 +679,12 @@ class MusicalAnalyzer:
         # Fallback to simple analysis
         return self.analyze_melodic_contour(contours)
 
-    def _analyze_pitch_classes(self, notes: List[Dict]) -> Dict:
+    def _analyze_pitch_classes(self, midi: np.ndarray) -> Dict:
         """Analyze distribution of pitch classes"""
-        if not notes:
+        if not len(midi):
             return {}
 
-        pitch_classes = [n['midi'] % 12 for n in notes]
+        pitch_classes = midi % 12
         hist, bin_edges = np.histogram(pitch_classes, bins=12, range=(0, 12))
 
         return {
@@ -386,63 +694,44 @@ class MusicalAnalyzer:
             'entropy': float(stats.entropy(hist))
         }
 
-    def _identify_melodic_motifs(self, notes: List[Dict], min_length: int = 3, max_length: int = 6) -> List[Dict]:
-        """Identify recurring melodic motifs using sliding window"""
-        if len(notes) < min_length:
-            return []
-
-        # Convert notes to interval sequences
-        intervals = []
-        for i in range(1, len(notes)):
-            intervals.append(notes[i]['midi'] - notes[i-1]['midi'])
+    def _identify_melodic_motifs(self, midi: np.ndarray, min_length: int = 3, max_length: Optional[int] = None,
+                                 top_k: int = 10) -> List[Dict]:
+        """Identify recurring melodic motifs as maximal repeats of the interval sequence
 
-        # Find repeating patterns
-        motifs = {}
-        for length in range(min_length, min(max_length, len(intervals))):
-            for i in range(len(intervals) - length + 1):
-                pattern = tuple(intervals[i:i+length])
-                motifs[pattern] = motifs.get(pattern, 0) + 1
+        Matching intervals rather than pitches finds transposed statements of
+        a motif too. Positions are the indices of each occurrence's first note.
+        """
+        if len(midi) < min_length + 1:
+            return []
 
-        # Filter and return significant motifs
-        significant_motifs = [
+        intervals = np.diff(midi)
+        return [
             {
-                'intervals': list(pattern),
-                'count': count,
-                'length': len(pattern)
+                'intervals': intervals[positions[0]:positions[0] + length].tolist(),
+                'count': len(positions),
+                'length': length,
+                'positions': positions.tolist()
             }
-            for pattern, count in motifs.items() 
-            if count > 1  # At least 2 occurrences
+            for length, positions in find_maximal_repeats(intervals, min_length, max_length, top_k)
         ]
 
-        return sorted(significant_motifs, key=lambda x: (-x['count'], -x['length']))
-
-    def analyze_musical_structure(self, composition_stream: stream.Stream) -> Dict:
+    def analyze_musical_structure(self, composition_stream: stream.Stream,
+                                  note_table: Optional[NoteTable] = None) -> Dict:
         """Enhanced structural analysis with form detection"""
+        if note_table is None:
+            note_table = extract_note_table(composition_stream)
+
         measures = composition_stream.getElementsByClass('Measure')
         parts = composition_stream.getElementsByClass('Part')
 
         structure_info = {
             'total_measures': len(measures),
             'total_parts': len(parts),
-            'duration_quarters': composition_stream.duration.quarterLength,
-            'time_signatures': [],
-            'key_signatures': [],
-            'tempo_markings': [],
+            'duration_quarters': note_table.duration,
+            'time_signatures': note_table.time_signatures,
+            'key_signatures': note_table.key_signatures,
+            'tempo_markings': note_table.tempo_markings,
             'section_analysis': self._analyze_sections(composition_stream)
         }
 
-        # Collect structural elements with measure numbers
-        for element in composition_stream.flat:
-            if isinstance(element, meter.TimeSignature):
-                measure_num = element.getContextByClass('Measure').measureNumber
-                structure_info['time_signatures'].append({
-                    'signature': str(element),
-                    'measure': measure_num
-                })
-            elif isinstance(element, key.KeySignature):
-                measure_num = element.getContextByClass('Measure').measureNumber
-                structure_info['key_signatures'].append({
-                    'signature': str(element),
-                    'measure': measure_num
-                })
-            elif isinstance(element, tempo.TempoIndication):
+        return structure_info